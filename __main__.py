@@ -42,8 +42,12 @@ set_repositories([
 # account and regional deployments
 with JunoAccount("deployment_account_name"):                    # this is the account that will be used to deploy the clusters
     with JunoRegion("us-east-1", ecr_master=True):        # this is the region that the clusters will be deployed to
+        # pass shared_network=True to build one VPC, NAT gateway and EFS for every cluster in the region
         pass
         # # example private cluster
+        # # pass karpenter=True to provision the node groups with Karpenter instead of the cluster-autoscaler
+        # # pass kube_proxy=Cluster.KubeProxyConfig(mode="ipvs") for IPVS service routing
+        # # pass twingate=Cluster.TwingateConnectors(count=4, node_group="service") to scale the remote access connectors
         # with Cluster(private=True) as cluster:
         #     # standard service node setup
         #     cluster.add_node_group(
@@ -59,17 +63,17 @@ with JunoAccount("deployment_account_name"):                    # this is the ac
         #     )
         #
         #     # example render node setup flagged for headless workloads and is GPU enabled
+        #     # instead of listing instance types, the requirements are expanded against the
+        #     # bundled instance catalog into a ranked and diversified list
         #     cluster.add_node_group(
         #         gpu=True,
         #         name="render",
-        #         instances=[
-        #             "m6a.4xlarge",
-        #             "m5a.4xlarge",
-        #             "m7a.4xlarge",
-        #             "r5.2xlarge",
-        #             "r6a.2xlarge",
-        #             "r7i.2xlarge"
-        #         ],
+        #         instances=cluster.InstanceRequirements(
+        #             vcpu=(8, 16),
+        #             memory=(32, 64),
+        #             gpus=1,
+        #             generation=5,
+        #         ),
         #         capacity_type=cluster.CapacityType.SPOT,
         #         minimum=0,
         #         size=0,
@@ -77,7 +81,10 @@ with JunoAccount("deployment_account_name"):                    # this is the ac
         #         labels={
         #             "juno-innovations.com/headless": "true",
         #         },
-        #         taints=["juno-innovations.com/headless"]
+        #         taints=["juno-innovations.com/headless"],
+        #         interruption_grace=110,                          # let frames checkpoint before a spot reclaim
+        #         gpu_sharing=cluster.GpuSharing(cluster.GpuSharing.Mode.EXCLUSIVE),
+        #         # placement_group=True,                        # pack the nodes close together, efa=True adds EFA interfaces
         #     )
         #
         #     # example render node setup flagged for workstation workloads and is GPU enabled
@@ -92,14 +99,28 @@ with JunoAccount("deployment_account_name"):                    # this is the ac
         #             "r6a.2xlarge",
         #             "r7i.2xlarge"
         #         ],
-        #         capacity_type=cluster.CapacityType.SPOT,
-        #         minimum=0,
-        #         size=0,
+        #         capacity_type=cluster.CapacityType.MIXED,        # spot first, on-demand when spot runs dry
+        #         on_demand_base=1,                                # always keep one on-demand workstation
+        #         minimum=1,
+        #         size=1,
         #         maximum=4,
         #         labels={
         #             "juno-innovations.com/workstation": "true",
         #         },
-        #         taints=["juno-innovations.com/workstation"]
+        #         taints=["juno-innovations.com/workstation"],
+        #         overprovision=1,                                 # keep one warm slot ready for the first artist
+        #         gpu_sharing=cluster.GpuSharing(                  # pack light sessions onto each GPU
+        #             cluster.GpuSharing.Mode.TIME_SLICING,
+        #             replicas=8,
+        #         ),
+        #         schedule=[                                       # pre-scale the pool before the studio opens
+        #             cluster.CapacityWindow(
+        #                 start="30 8 * * MON-FRI",
+        #                 end="0 19 * * MON-FRI",
+        #                 minimum=2,
+        #                 time_zone="America/Los_Angeles",
+        #             )
+        #         ]
         #     )
         #
         # # example public cluster
@@ -0,0 +1,37 @@
+{{/*
+Sync wave of a bootstrap addon, the length of its longest dependency chain in
+.Values.dependencies. Usage: include "bootstrap.wave" (list $ "addon")
+*/}}
+{{- define "bootstrap.wave" -}}
+{{- $root := index . 0 }}
+{{- include "bootstrap.depth" (dict "graph" $root.Values.dependencies "addon" (index . 1) "path" (list)) | quote }}
+{{- end }}
+
+{{/*
+Longest dependency chain below an addon, fails on unknown addons and cycles
+*/}}
+{{- define "bootstrap.depth" -}}
+{{- if has .addon .path }}
+{{- fail (printf "bootstrap dependency cycle: %s -> %s" (join " -> " .path) .addon) }}
+{{- end }}
+{{- if not (hasKey .graph .addon) }}
+{{- fail (printf "unknown bootstrap addon in dependencies: %s" .addon) }}
+{{- end }}
+{{- $depth := 0 }}
+{{- $path := append .path .addon }}
+{{- range (get .graph .addon) }}
+{{- $dependency := include "bootstrap.depth" (dict "graph" $.graph "addon" . "path" $path) | atoi }}
+{{- $depth = max $depth (add1 $dependency) }}
+{{- end }}
+{{- $depth }}
+{{- end }}
+
+{{/*
+Walk the whole dependency graph so cycles fail the render even when the addons involved are
+disabled
+*/}}
+{{- define "bootstrap.validate" -}}
+{{- range $addon, $dependencies := .Values.dependencies }}
+{{- $depth := include "bootstrap.depth" (dict "graph" $.Values.dependencies "addon" $addon "path" (list)) }}
+{{- end }}
+{{- end }}
@@ -0,0 +1,42 @@
+"""
+Budget reference topology: public and private clusters in two regions, one with Karpenter
+"""
+# local
+from src import JunoAccount, JunoRegion, Cluster, set_repositories, set_profile, set_session
+
+JunoAccount.set_root_account("management")
+set_profile("management")
+set_session("budget")
+
+Cluster.set_bootstrap_repository(
+    repository="https://github.com/juno-fx/aws-eks-deployment.git",
+    path="bootstrap/",
+    ref="main",
+    domain="example.com",
+)
+set_repositories(["hubble", "kuiper", "titan"])
+
+with JunoAccount("deployment"):
+    for region, karpenter in (("us-east-1", False), ("us-west-2", True)):
+        with JunoRegion(region, ecr_master=region == "us-east-1", ecr_sync=region != "us-east-1"):
+            for private in (True, False):
+                with Cluster(private=private, karpenter=karpenter) as cluster:
+                    cluster.add_node_group(
+                        name="service",
+                        instances=["c6a.xlarge", "t3.xlarge"],
+                        capacity_type=cluster.CapacityType.ON_DEMAND,
+                        minimum=1,
+                        size=1,
+                        maximum=5,
+                        labels={"juno-innovations.com/service": "true"},
+                    )
+                    cluster.add_node_group(
+                        name="workstation",
+                        instances=["m6a.2xlarge"],
+                        capacity_type=cluster.CapacityType.SPOT,
+                        minimum=0,
+                        size=0,
+                        maximum=10,
+                        labels={"juno-innovations.com/workstation": "true"},
+                        taints=["juno-innovations.com/workstation"],
+                    )
@@ -0,0 +1,30 @@
+"""
+Budget reference topology: a private and a public cluster on the shared network of a region
+"""
+# local
+from src import JunoAccount, JunoRegion, Cluster, set_profile, set_session
+
+JunoAccount.set_root_account("management")
+set_profile("management")
+set_session("budget")
+
+Cluster.set_bootstrap_repository(
+    repository="https://github.com/juno-fx/aws-eks-deployment.git",
+    path="bootstrap/",
+    ref="main",
+    domain="example.com",
+)
+
+with JunoAccount("deployment"):
+    with JunoRegion("us-east-1", shared_network=True):
+        for private in (True, False):
+            with Cluster(private=private) as cluster:
+                cluster.add_node_group(
+                    name="service",
+                    instances=["c6a.xlarge", "t3.xlarge"],
+                    capacity_type=cluster.CapacityType.SPOT,
+                    minimum=1,
+                    size=1,
+                    maximum=5,
+                    labels={"juno-innovations.com/service": "true"},
+                )
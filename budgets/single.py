@@ -0,0 +1,41 @@
+"""
+Budget reference topology: one private cluster with a service and a GPU workstation node group
+"""
+# local
+from src import JunoAccount, JunoRegion, Cluster, set_repositories, set_profile, set_session
+
+JunoAccount.set_root_account("management")
+set_profile("management")
+set_session("budget")
+
+Cluster.set_bootstrap_repository(
+    repository="https://github.com/juno-fx/aws-eks-deployment.git",
+    path="bootstrap/",
+    ref="main",
+    domain="example.com",
+)
+set_repositories(["hubble", "kuiper", "titan"])
+
+with JunoAccount("deployment"):
+    with JunoRegion("us-east-1", ecr_master=True):
+        with Cluster(private=True) as cluster:
+            cluster.add_node_group(
+                name="service",
+                instances=["c6a.xlarge", "t3.xlarge"],
+                capacity_type=cluster.CapacityType.SPOT,
+                minimum=1,
+                size=1,
+                maximum=5,
+                labels={"juno-innovations.com/service": "true"},
+            )
+            cluster.add_node_group(
+                gpu=True,
+                name="workstation",
+                instances=["g5.2xlarge", "g4dn.2xlarge"],
+                capacity_type=cluster.CapacityType.SPOT,
+                minimum=0,
+                size=0,
+                maximum=4,
+                labels={"juno-innovations.com/workstation": "true"},
+                taints=["juno-innovations.com/workstation"],
+            )
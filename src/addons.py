@@ -0,0 +1,105 @@
+"""
+EKS managed addon configuration
+"""
+
+# std
+from json import dumps
+
+# 3rd
+from pulumi import Output, InvokeOptions, ProviderResource
+from pulumi_aws.eks import get_addon_version_output
+
+
+# EKS addon versions, kube-proxy and CoreDNS follow the Kubernetes version of the cluster
+ADDON_VERSIONS = {
+    "vpc-cni": "v1.19.2-eksbuild.5",
+    "aws-ebs-csi-driver": "v1.39.0-eksbuild.1",
+    "aws-efs-csi-driver": "v2.1.4-eksbuild.1",
+}
+
+
+def cluster_addon_version(
+    addon: str, kubernetes_version: Output, provider: ProviderResource
+) -> Output:
+    """
+    Default version of an addon for the Kubernetes version of a cluster
+    """
+    return get_addon_version_output(
+        addon_name=addon,
+        kubernetes_version=kubernetes_version,
+        opts=InvokeOptions(provider=provider),
+    ).version
+
+
+class KubeProxyConfig:
+    """
+    kube-proxy addon configuration
+
+    mode is iptables or ipvs. ipvs keeps service updates constant time with many services and
+    endpoints and balances with scheduler (rr, lc, sh, ...). In ipvs mode NodeLocal DNSCache
+    can't intercept the kube-dns service IP.
+    """
+
+    def __init__(self, mode: str = "iptables", scheduler: str = "rr"):
+        if mode not in {"iptables", "ipvs"}:
+            raise ValueError(f"Invalid kube-proxy mode: {mode}")
+        self.mode = mode
+        self.scheduler = scheduler
+
+    def configuration_values(self) -> str:
+        """
+        Addon configuration values
+        """
+        config = {"mode": self.mode}
+        if self.mode == "ipvs":
+            config["ipvs"] = {"scheduler": self.scheduler}
+        return dumps(config)
+
+
+class CoreDnsConfig:
+    """
+    CoreDNS addon configuration
+
+    replicas is the starting replica count. With autoscaling the addon scales CoreDNS between
+    min_replicas and max_replicas, otherwise the proportional autoscaler of the bootstrap dns
+    addon does.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        replicas: int = 2,
+        cpu: str = "200m",
+        memory: str = "128Mi",
+        memory_limit: str = "256Mi",
+        autoscaling: bool = False,
+        min_replicas: int = 2,
+        max_replicas: int = 20,
+    ):
+        if autoscaling and not 0 < min_replicas <= max_replicas:
+            raise ValueError("CoreDNS min_replicas must be between 1 and max_replicas")
+        self.replicas = replicas
+        self.cpu = cpu
+        self.memory = memory
+        self.memory_limit = memory_limit
+        self.autoscaling = autoscaling
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+
+    def configuration_values(self) -> str:
+        """
+        Addon configuration values
+        """
+        config = {
+            "replicaCount": self.replicas,
+            "resources": {
+                "requests": {"cpu": self.cpu, "memory": self.memory},
+                "limits": {"memory": self.memory_limit},
+            },
+        }
+        if self.autoscaling:
+            config["autoScaling"] = {
+                "enabled": True,
+                "minReplicas": self.min_replicas,
+                "maxReplicas": self.max_replicas,
+            }
+        return dumps(config)
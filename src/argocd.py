@@ -0,0 +1,168 @@
+"""
+ArgoCD install profile
+"""
+
+# std
+from typing import Dict, List
+
+# 3rd
+from pulumi import ResourceOptions
+
+
+ARGOCD_MANIFEST = "https://raw.githubusercontent.com/argoproj/argo-cd/stable/manifests/install.yaml"
+ARGOCD_HA_MANIFEST = (
+    "https://raw.githubusercontent.com/argoproj/argo-cd/stable/manifests/ha/install.yaml"
+)
+
+# argocd-cmd-params-cm values ArgoCD runs with when they aren't set
+UPSTREAM_PARAMS = {
+    "controller.sharding.algorithm": "legacy",
+    "controller.status.processors": "20",
+    "controller.operation.processors": "10",
+    "reposerver.parallelism.limit": "0",
+}
+
+# ArgoCD stopped assessing Application health in 1.8, without it a sync wave of the bootstrap
+# app moves on as soon as the child Applications exist instead of when they are healthy
+APPLICATION_HEALTH = """hs = {}
+hs.status = "Progressing"
+hs.message = ""
+if obj.status ~= nil then
+  if obj.status.health ~= nil then
+    hs.status = obj.status.health.status
+    if obj.status.health.message ~= nil then
+      hs.message = obj.status.health.message
+    end
+  end
+end
+return hs
+"""
+
+
+class ArgoCDScale:
+    """
+    Scale profile for the ArgoCD install
+
+    ha installs the HA manifest (redis-ha with sentinels, needs at least three nodes for the
+    anti-affinity rules). Applications are sharded over controller_replicas application
+    controllers, each running status_processors and operation_processors workers. The repo
+    server runs repo_server_replicas pods with at most repo_server_parallelism concurrent
+    manifest generations each, 0 is unlimited. repo_server_replicas and the redis resources
+    default to the install manifest. Only the settings that differ from upstream are written.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        ha: bool = False,
+        controller_replicas: int = 1,
+        status_processors: int = 20,
+        operation_processors: int = 10,
+        repo_server_replicas: int = None,
+        repo_server_parallelism: int = 0,
+        redis_cpu: str = None,
+        redis_memory: str = None,
+    ):
+        if controller_replicas < 1 or (
+            repo_server_replicas is not None and repo_server_replicas < 1
+        ):
+            raise ValueError("ArgoCD controller and repo server replicas must be at least 1")
+        self.ha = ha
+        self.controller_replicas = controller_replicas
+        self.status_processors = status_processors
+        self.operation_processors = operation_processors
+        self.repo_server_replicas = repo_server_replicas
+        self.repo_server_parallelism = repo_server_parallelism
+        self.redis_cpu = redis_cpu
+        self.redis_memory = redis_memory
+
+    def __str__(self):
+        return (
+            f"{'HA' if self.ha else 'standard'}, {self.controller_replicas} controller shard(s), "
+            f"{self.repo_server_replicas or 'default'} repo server(s)"
+        )
+
+    @property
+    def manifest(self) -> str:
+        """
+        Install manifest for the profile
+        """
+        return ARGOCD_HA_MANIFEST if self.ha else ARGOCD_MANIFEST
+
+    def cmd_params(self) -> Dict[str, str]:
+        """
+        Contents of argocd-cmd-params-cm that differ from upstream
+        """
+        params = {
+            "controller.sharding.algorithm": (
+                "consistent-hashing" if self.controller_replicas > 1 else "legacy"
+            ),
+            "controller.status.processors": str(self.status_processors),
+            "controller.operation.processors": str(self.operation_processors),
+            "reposerver.parallelism.limit": str(self.repo_server_parallelism),
+        }
+        return {key: value for key, value in params.items() if UPSTREAM_PARAMS[key] != value}
+
+    def redis_resources(self, resources: Dict = None) -> Dict:
+        """
+        Redis container resources with the requests and memory limit of the profile applied
+        """
+        resources = {key: dict(value) for key, value in (resources or {}).items()}
+        if self.redis_cpu:
+            resources.setdefault("requests", {})["cpu"] = self.redis_cpu
+        if self.redis_memory:
+            resources.setdefault("requests", {})["memory"] = self.redis_memory
+            resources.setdefault("limits", {})["memory"] = self.redis_memory
+        return resources
+
+    def transformations(self) -> List:
+        """
+        ConfigFile transformations applying the profile to the install manifest
+        """
+
+        def transform(obj: Dict, _opts: ResourceOptions):
+            kind = obj.get("kind")
+            name = obj.get("metadata", {}).get("name", "")
+
+            if kind == "ConfigMap" and name == "argocd-cmd-params-cm" and self.cmd_params():
+                obj["data"] = {**(obj.get("data") or {}), **self.cmd_params()}
+
+            elif kind == "ConfigMap" and name == "argocd-cm":
+                obj["data"] = {
+                    **(obj.get("data") or {}),
+                    "resource.customizations.health.argoproj.io_Application": APPLICATION_HEALTH,
+                }
+
+            elif (
+                kind == "StatefulSet"
+                and name == "argocd-application-controller"
+                and self.controller_replicas > 1
+            ):
+                obj["spec"]["replicas"] = self.controller_replicas
+                for container in obj["spec"]["template"]["spec"]["containers"]:
+                    # the controllers use the replica count to work out their shard
+                    env = [
+                        var
+                        for var in container.get("env") or []
+                        if var["name"] != "ARGOCD_CONTROLLER_REPLICAS"
+                    ]
+                    env.append({
+                        "name": "ARGOCD_CONTROLLER_REPLICAS",
+                        "value": str(self.controller_replicas),
+                    })
+                    container["env"] = env
+
+            elif (
+                kind == "Deployment" and name == "argocd-repo-server" and self.repo_server_replicas
+            ):
+                obj["spec"]["replicas"] = self.repo_server_replicas
+
+            elif (
+                kind in {"Deployment", "StatefulSet"}
+                and name.startswith("argocd-redis")
+                and (self.redis_cpu or self.redis_memory)
+            ):
+                for container in obj["spec"]["template"]["spec"]["containers"]:
+                    if container["name"] == "redis":
+                        container["resources"] = self.redis_resources(container.get("resources"))
+
+        return [transform]
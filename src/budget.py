@@ -0,0 +1,177 @@
+"""
+Invoke and resource budgets
+
+Plans the reference topologies offline and checks the invokes by token and the resources by
+type against the budget file, so an invoke added to a per-cluster loop or a cluster that
+doubles its resources fails the check instead of slowing down every preview.
+
+    python -m src.budget [budgets/budgets.json]
+
+Budgets are per scope: stack, account, region or cluster. Invoke budgets cap the total calls
+at the budget times the number of accounts, regions or clusters in the topology, resource
+budgets cap every single context of the scope. Resource types are matched with fnmatch
+patterns. An invoke without a budget fails the check.
+
+    {
+        "topologies": ["single.py"],
+        "invokes": {
+            "aws:index/getAvailabilityZones:getAvailabilityZones": {"per": "region", "max": 1}
+        },
+        "resources": [{"type": "aws:iam/*", "per": "cluster", "max": 20}]
+    }
+"""
+
+# std
+import os
+import sys
+import json
+import argparse
+import subprocess
+import contextlib
+from fnmatch import fnmatch
+from typing import Dict, List
+
+# local
+from .plan import PROVIDER, plan, inventory
+
+
+BUDGETS = os.path.join("budgets", "budgets.json")
+SCOPES = {"stack": 0, "account": 1, "region": 2, "cluster": 3}
+
+
+def measure(path: str) -> Dict:
+    """
+    Invokes, scope units and resource types per context of a topology
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        mocks = plan(path, {})
+
+    providers = [
+        resource["name"]
+        for resource in mocks.resources
+        if resource["type"] == "pulumi:providers:aws"
+    ]
+    regions = len([name for name in providers if PROVIDER.match(name)])
+    clusters = [resource for resource in mocks.resources if resource["type"] == "eks:index:Cluster"]
+    return {
+        "units": {
+            "stack": 1,
+            "account": len(providers) - regions,
+            "region": regions,
+            "cluster": len(clusters),
+        },
+        "invokes": mocks.invokes,
+        "contexts": {label: entry["types"] for label, entry in inventory(mocks.resources).items()},
+    }
+
+
+def _measure_isolated(path: str) -> Dict:
+    """
+    Measure a topology in its own interpreter, the contexts and mocks are process globals
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "src.budget", "--measure", path],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode:
+        raise ValueError(f"Planning {path} failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def _scope_totals(contexts: Dict[str, Dict[str, int]], scope: str, pattern: str) -> Dict:
+    """
+    Matching resources in every context of a scope
+    """
+    depth = SCOPES[scope]
+    totals = {}
+    for label, types in contexts.items():
+        if depth and (label == "other" or len(label.split("/")) != depth):
+            continue
+        key = label if depth else "stack"
+        matched = totals.setdefault(key, {})
+        for kind, count in types.items():
+            if fnmatch(kind, pattern):
+                matched[kind] = matched.get(kind, 0) + count
+    return totals
+
+
+def check(measured: Dict, budgets: Dict) -> List[str]:
+    """
+    Budget violations of a measured topology
+    """
+    violations = []
+    units = measured["units"]
+
+    for token, calls in sorted(measured["invokes"].items()):
+        budget = budgets.get("invokes", {}).get(token)
+        if budget is None:
+            violations.append(f"{token}: {calls} calls without a budget")
+            continue
+        allowed = budget["max"] * units[budget["per"]]
+        if calls > allowed:
+            violations.append(
+                f"{token}: {calls} calls > {allowed} allowed "
+                f"({budget['max']} per {budget['per']} x {units[budget['per']]}), "
+                f"+{calls - allowed}"
+            )
+
+    for budget in budgets.get("resources", []):
+        pattern = budget["type"]
+        for label, matched in _scope_totals(measured["contexts"], budget["per"], pattern).items():
+            count = sum(matched.values())
+            if count <= budget["max"]:
+                continue
+            violations.append(
+                f"{pattern} in {label}: {count} resources > {budget['max']} per "
+                f"{budget['per']}, +{count - budget['max']}"
+            )
+            for kind, found in sorted(matched.items(), key=lambda item: -item[1]):
+                violations.append(f"\t{found:>4} {kind}")
+
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoke and resource budgets")
+    parser.add_argument("budgets", nargs="?", default=BUDGETS)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    with open(args.budgets) as handle:
+        budgets = json.load(handle)
+
+    failed = False
+    for topology in budgets["topologies"]:
+        path = os.path.join(os.path.dirname(args.budgets), topology)
+        try:
+            measured = _measure_isolated(path)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+
+        violations = check(measured, budgets)
+        units = ", ".join(
+            f"{count} {scope}{'' if count == 1 else 's'}"
+            for scope, count in measured["units"].items()
+            if scope != "stack"
+        )
+        calls = sum(measured["invokes"].values())
+        resources = sum(sum(types.values()) for types in measured["contexts"].values())
+        status = "over budget" if violations else "ok"
+        print(f"{topology} ({units}): {calls} invokes, {resources} resources, {status}")
+        for violation in violations:
+            print(f"\t{violation}")
+        failed = failed or bool(violations)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
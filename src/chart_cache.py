@@ -0,0 +1,184 @@
+"""
+Render cache for local helm charts
+
+helm.Chart templates the chart through the provider on every preview and update. CachedChart
+keeps the rendered objects on disk keyed by a hash of the chart files and the values, so an
+unchanged cluster reuses its render. Outputs in the values are swapped for deterministic
+placeholders before rendering and substituted back into the rendered objects, which keeps the
+key stable whether the outputs are known or not, templates can print output values but not
+branch on them. Editing any file of the chart changes the key.
+
+The cache lives in ~/.cache/juno/charts, JUNO_CHART_CACHE moves it.
+"""
+
+# std
+import os
+import json
+import hashlib
+from copy import deepcopy
+from typing import Any, Dict, List, Tuple, Union
+
+# 3rd
+import pulumi
+from pulumi import Output, ComponentResource, ResourceOptions, InvokeOptions, Alias
+from pulumi_kubernetes.helm.v3 import LocalChartOpts
+
+# the parser helm.Chart hands its rendered objects to
+from pulumi_kubernetes.yaml.yaml import _parse_yaml_document  # noqa: PLC2701
+
+
+CACHE_DIR = os.environ.get(
+    "JUNO_CHART_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "juno", "charts")
+)
+
+
+def chart_hash(path: str) -> str:
+    """
+    Hash of every file in a chart directory
+    """
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file = os.path.join(root, name)
+            hasher.update(os.path.relpath(file, path).encode())
+            with open(file, "rb") as handle:
+                hasher.update(handle.read())
+    return hasher.hexdigest()
+
+
+def with_placeholders(values: Any, path: str = "") -> Tuple[Any, Dict[str, Output]]:
+    """
+    Replace the outputs in values with placeholders named after their path
+    """
+    if isinstance(values, Output):
+        placeholder = f"__juno_{path or 'value'}__"
+        return placeholder, {placeholder: values}
+
+    substitutions = {}
+    if isinstance(values, dict):
+        plain = {}
+        for key, value in values.items():
+            plain[key], found = with_placeholders(value, f"{path}.{key}" if path else str(key))
+            substitutions.update(found)
+        return plain, substitutions
+
+    if isinstance(values, (list, tuple)):
+        plain = []
+        for index, value in enumerate(values):
+            item, found = with_placeholders(value, f"{path}.{index}")
+            plain.append(item)
+            substitutions.update(found)
+        return plain, substitutions
+
+    return values, substitutions
+
+
+def substitute(obj: Any, substitutions: Dict[str, Output]) -> Any:
+    """
+    Put the outputs back in place of their placeholders
+    """
+    if isinstance(obj, dict):
+        return {key: substitute(value, substitutions) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [substitute(value, substitutions) for value in obj]
+    if not isinstance(obj, str) or "__juno_" not in obj:
+        return obj
+    if obj in substitutions:
+        return substitutions[obj]
+
+    # placeholders templated into a longer string
+    found = [placeholder for placeholder in substitutions if placeholder in obj]
+    if not found:
+        return obj
+
+    def replace(resolved: List) -> str:
+        text = obj
+        for placeholder, value in zip(found, resolved):
+            text = text.replace(placeholder, str(value))
+        return text
+
+    return Output.all(*[substitutions[placeholder] for placeholder in found]).apply(replace)
+
+
+def _cache_file(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def load_render(key: str) -> Union[List[Dict], None]:
+    """
+    Cached render of a chart
+    """
+    try:
+        with open(_cache_file(key)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def store_render(key: str, objects: List[Dict]) -> List[Dict]:
+    """
+    Atomically cache a render
+    """
+    # renders carry the values, twingate keys included
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    temp = f"{_cache_file(key)}.{os.getpid()}"
+    with open(os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as handle:
+        json.dump(objects, handle)
+    os.replace(temp, _cache_file(key))
+    return objects
+
+
+class CachedChart(ComponentResource):
+    """
+    Local helm chart rendered through the cache
+
+    Drop in for helm.Chart with LocalChartOpts, it keeps the resource names of helm.Chart so
+    existing stacks adopt it without replacing the chart resources.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        name: str,
+        path: str,
+        values: Dict,
+        namespace: str = None,
+        resource_prefix: str = None,
+        opts: ResourceOptions = None,
+    ):
+        release_name = f"{resource_prefix}-{name}" if resource_prefix else name
+        super().__init__(
+            "juno:helm:CachedChart",
+            release_name,
+            None,
+            ResourceOptions.merge(
+                opts, ResourceOptions(aliases=[Alias(type_="kubernetes:helm.sh/v3:Chart")])
+            ),
+        )
+
+        plain, substitutions = with_placeholders(values)
+        key = hashlib.sha256(
+            json.dumps([chart_hash(path), namespace, release_name, plain], sort_keys=True).encode()
+        ).hexdigest()
+
+        objects = load_render(key)
+        if objects is None:
+            chart = LocalChartOpts(path=path, namespace=namespace, values=plain)
+            chart.release_name = release_name
+            invoke_opts = InvokeOptions(parent=self, provider=opts.provider if opts else None)
+
+            async def template(json_opts: str) -> List[Dict]:
+                result = await pulumi.runtime.invoke_async(
+                    "kubernetes:helm:template", {"jsonOpts": json_opts}, invoke_opts
+                )
+                return store_render(key, (result or {}).get("result", []))
+
+            objects = chart.to_json().apply(template)
+
+        self.resources = Output.from_input(objects).apply(
+            lambda rendered: _parse_yaml_document(
+                [substitute(deepcopy(obj), substitutions) for obj in rendered],
+                ResourceOptions(parent=self),
+            )
+        )
+        self.register_outputs({"resources": self.resources})
@@ -11,7 +11,7 @@ from enum import Enum
 
 # 3rd
 from pulumiverse_time import Sleep
-from pulumi import ResourceOptions
+from pulumi import ResourceOptions, Output
 from pulumi_aws.ec2 import (
     RouteTable,
     InternetGateway,
@@ -20,11 +20,8 @@ from pulumi_aws.ec2 import (
 )
 from pulumi_aws.iam import Role
 import pulumi_kubernetes as k8s
-import pulumi_kubernetes.helm.v3 as helm
-from pulumi import InvokeOptions
-from pulumi_aws import get_availability_zones
 from pulumi_aws.ec2.vpc import Vpc
-from pulumi_aws.ec2 import Subnet, NatGateway, Eip, VpcIpv4CidrBlockAssociation
+from pulumi_aws.ec2 import Subnet, NatGateway
 from pulumi_eks import (
     Cluster as EksCluster,
     ClusterArgs,
@@ -39,19 +36,46 @@ from pulumi_aws.efs import FileSystem, MountTarget
 from pulumi_aws.ec2.security_group import SecurityGroup
 
 # local
+from .argocd import ArgoCDScale
+from .chart_cache import CachedChart
+from .addons import ADDON_VERSIONS, KubeProxyConfig, CoreDnsConfig, cluster_addon_version
 from .node_role import build_node_role
-from .provider import juno_resource, get_context, context_prefix, set_cluster
+from .instances import (
+    smallest_shape,
+    InstanceRequirements,
+    select_instances,
+    instance_report,
+    get_catalog,
+    instance_architecture,
+)
+from .node_group import (
+    CapacityWindow,
+    validate_schedule,
+    build_capacity_schedule,
+    GpuSharing,
+    NodeGroupUpdate,
+    validate_efa,
+    build_placement_template,
+    node_ami_type,
+    gpu_driver,
+    cluster_gpu_driver,
+    PRIORITY_PREFERRED,
+    PRIORITY_FALLBACK,
+)
+from .karpenter import build_karpenter, node_pool, KARPENTER_NODE_LABEL
+from .interruption import (
+    build_termination_handler,
+    DEFAULT_INTERRUPTION_GRACE,
+    MAX_INTERRUPTION_GRACE,
+)
+from .token_cache import cached_kubeconfig
+from .twingate import TwingateConnectors
+from .provider import juno_resource, get_context, context_prefix, context_export, set_cluster
 from .security import SecuritySpec
+from .network import create_subnet, build_nat_gateway
 from .context.session import get_profile
 
 
-azs = get_availability_zones(state="available").names
-
-
-if not os.environ.get("GIT_USER") or not os.environ.get("GIT_PASS"):
-    raise ValueError("GIT_USER and GIT_PASS must be set in the environment for GitHub")
-
-
 class Cluster:
     """
     Regional Cluster
@@ -75,21 +99,93 @@ class Cluster:
     class CapacityType(Enum):
         SPOT = "SPOT"
         ON_DEMAND = "ON_DEMAND"
-
-    def __init__(self, private: bool = False):
+        MIXED = "MIXED"
+
+    ArgoCDScale = ArgoCDScale
+    CapacityWindow = CapacityWindow
+    CoreDnsConfig = CoreDnsConfig
+    GpuSharing = GpuSharing
+    NodeGroupUpdate = NodeGroupUpdate
+    InstanceRequirements = InstanceRequirements
+    KubeProxyConfig = KubeProxyConfig
+    TwingateConnectors = TwingateConnectors
+
+    def __init__(  # noqa: PLR0913 PLR0915 PLR0917
+        self,
+        private: bool = False,
+        karpenter: bool = False,
+        kube_proxy: KubeProxyConfig = None,
+        coredns: CoreDnsConfig = None,
+        argocd: ArgoCDScale = None,
+        max_parallel_rollouts: int = None,
+        twingate: TwingateConnectors = None,
+        kubernetes_version: str = None,
+    ):
         """
         Setup regional Cluster
+
+        With karpenter enabled, node groups are provisioned by Karpenter NodePools instead of
+        the cluster-autoscaler. Only the minimum of each group stays a managed node group.
+
+        kube_proxy and coredns configure the managed kube-proxy and CoreDNS addons. Their versions
+        follow the Kubernetes version of the cluster.
+
+        kubernetes_version pins the control plane version, e.g. "1.31". By default a new cluster
+        gets the EKS default and an existing cluster keeps its version.
+
+        argocd is the scale profile of the ArgoCD install that syncs the bootstrap chart.
+
+        max_parallel_rollouts limits how many managed node groups are created or updated at
+        once, every group waits on the one max_parallel_rollouts groups before it.
+
+        twingate sizes and places the Twingate connector pool when Twingate is configured in
+        the environment, two connectors on separate nodes by default.
         """
+        if not os.environ.get("GIT_USER") or not os.environ.get("GIT_PASS"):
+            raise ValueError("GIT_USER and GIT_PASS must be set in the environment for GitHub")
+
         set_cluster("private" if private else "public")
 
         # instance variables
         self.context = get_context()
         self.private = private
+        self.karpenter = karpenter
 
-        # VPC CIDR's
-        self.production_cidr = "192.168.0.0/18"
-        self.dropped_cidr = "192.168.64.0/24"
-        self.service_cidr = "192.168.65.0/24"
+        # labels the prefix in the deployment timeline
+        context_export(
+            "context",
+            {
+                "account": self.context.account,
+                "region": self.context.region,
+                "cluster": f"{context_prefix()}{'-private' if private else '-public'}",
+            },
+        )
+
+        # VPC CIDR's, clusters on the shared network of the region get a slice of its VPC
+        self.network = self.context.network
+        if self.network:
+            self.production_cidr, self.dropped_cidr = self.network.cluster_cidrs(private)
+            self.service_cidr = self.network.SERVICE_CIDR
+        else:
+            self.production_cidr = "192.168.0.0/18"
+            self.dropped_cidr = "192.168.64.0/24"
+            self.service_cidr = "192.168.65.0/24"
+
+        # kubernetes networking
+        self.kube_proxy = kube_proxy or KubeProxyConfig()
+        self.coredns = coredns or CoreDnsConfig()
+        self.kubernetes_version = kubernetes_version
+
+        # gitops
+        self.argocd = argocd or ArgoCDScale()
+
+        # node group rollouts
+        if max_parallel_rollouts is not None and max_parallel_rollouts < 1:
+            raise ValueError("max_parallel_rollouts must be at least 1")
+        self.max_parallel_rollouts = max_parallel_rollouts
+
+        # remote access
+        self.twingate = twingate or TwingateConnectors()
 
         # networking
         self.vpc: Union[Vpc, None] = None
@@ -103,16 +199,21 @@ class Cluster:
         self.cluster: Union[EksCluster, None] = None
         self.cluster_name: str = f"{context_prefix()}{name}"
         self.base_node_role: Union[Role, None] = None
-        self.kubeconfig_opts = KubeconfigOptionsArgs(profile_name=get_profile())
         self.nodes = []
+        self.node_groups = []
+        self.expander_priorities: Dict[str, List[str]] = {}
+        self.interruption_tiers: Dict[int, Dict[str, ManagedNodeGroup]] = {}
+        self.gpu_sharing: Dict[str, Dict] = {}
+        self.gpu_drivers: List[str] = []
         self.argo_provider: Union[k8s.Provider, None] = None
         self.k8s_provider: Union[k8s.Provider, None] = None
         self.file_system: Union[FileSystem, None] = None
+        self.karpenter_values: Union[dict, None] = None
+        self.karpenter_nodes = 0
+        self.efa_security_group: Union[SecurityGroup, None] = None
 
         # zones
-        self.availability_zones = get_availability_zones(
-            state="available", opts=InvokeOptions(provider=self.context.provider)
-        ).names
+        self.availability_zones = self.context.availability_zones
         self.production_zone = self.availability_zones[0]
         self.dropped_zone = self.availability_zones[1]
 
@@ -121,6 +222,13 @@ class Cluster:
         print(f"Cluster: {self.cluster_name}")
         print(f"\tPrivate: {self.private}")
         print(f"\tTwingate Enabled: {enabled}")
+        if enabled:
+            print(f"\tTwingate Connectors: {self.twingate}")
+        print(f"\tKarpenter Enabled: {self.karpenter}")
+        print(f"\tKubernetes Version: {self.kubernetes_version or 'EKS default'}")
+        print(f"\tKube Proxy Mode: {self.kube_proxy.mode}")
+        print(f"\tArgoCD: {self.argocd}")
+        print(f"\tShared Network: {self.network is not None}")
         print(f"\tProduction CIDR: {self.production_cidr}")
         print(f"\tService CIDR: {self.service_cidr}")
         print(f"\tDropped CIDR: {self.dropped_cidr}")
@@ -138,6 +246,11 @@ class Cluster:
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.karpenter and self.node_groups and not self.karpenter_nodes:
+            raise ValueError(
+                f"Karpenter runs on the {KARPENTER_NODE_LABEL} nodes, a node group with that "
+                "label needs a minimum above 0"
+            )
         if self.nodes:
             self.bootstrap()
         set_cluster(None)
@@ -146,6 +259,10 @@ class Cluster:
         """
         Build storage resources for this Region
         """
+        if self.network:
+            self.file_system = self.network.file_system
+            return
+
         self.file_system = FileSystem(
             availability_zone_name=self.production_zone,
             **juno_resource("efs"),
@@ -155,6 +272,10 @@ class Cluster:
         """
         Build the mount target
         """
+        # the shared filesystem is mounted in the storage subnet of the region
+        if self.network:
+            return
+
         MountTarget(
             subnet_id=self.production_subnet.id,
             file_system_id=self.file_system.id,
@@ -182,83 +303,29 @@ class Cluster:
         """
         Create a subnet
         """
-        parent = self.vpc
-        if associate:
-            association = VpcIpv4CidrBlockAssociation(
-                vpc_id=self.vpc.id,
-                cidr_block=cidr,
-                **juno_resource(
-                    f"{name}-association",
-                    opts=dict(depends_on=[self.vpc], parent=self.vpc),
-                    no_tags=True,
-                ),
-            )
-            parent = association
-
-        return Subnet(
-            vpc_id=self.vpc.id,
-            cidr_block=cidr,
-            map_public_ip_on_launch=not private,
-            availability_zone=zone,
-            **juno_resource(name, opts=dict(depends_on=[parent], parent=parent)),
-        )
+        return create_subnet(self.vpc, name, cidr, zone, private=private, associate=associate)
 
     def build_service_networking(self, internet_gateway: InternetGateway) -> NatGateway:
         """
         Build out networking for the service subnet to serve private subnets
         """
-        # service subnet needs to have public access so traffic can be
-        # routed through the NAT gateway
-        self.service_subnet = self.create_subnet(
-            "service", self.service_cidr, self.production_zone, private=False
-        )
-
-        # service subnet which has internet for the NAT
-        eip = Eip(
-            **juno_resource(
-                "nat-eip", opts=dict(depends_on=[internet_gateway], parent=internet_gateway)
-            ),
-        )
-        service_route_table = RouteTable(
-            vpc_id=self.vpc.id,
-            **juno_resource("service-routing-table", opts=dict(parent=self.service_subnet)),
-        )
-        Route(
-            route_table_id=service_route_table.id,
-            destination_cidr_block="0.0.0.0/0",
-            gateway_id=internet_gateway.id,
-            **juno_resource(
-                "service-internet-gateway-route",
-                opts=dict(parent=service_route_table),
-                no_tags=True,
-            ),
-        )
-        RouteTableAssociation(
-            route_table_id=service_route_table.id,
-            subnet_id=self.service_subnet.id,
-            **juno_resource(
-                "service-connect-routing-association",
-                opts=dict(parent=service_route_table),
-                no_tags=True,
-            ),
-        )
-
-        return NatGateway(
-            subnet_id=self.service_subnet.id,
-            allocation_id=eip.id,
-            **juno_resource("nat-gateway", opts=dict(depends_on=[eip], parent=eip)),
+        return build_nat_gateway(
+            self.vpc, internet_gateway, self.service_cidr, self.production_zone
         )
 
     def build_networking(self):
         """
         Build networking for this Region
         """
-        self.vpc = Vpc(
-            enable_dns_hostnames=True,
-            enable_dns_support=True,
-            cidr_block=self.production_cidr,
-            **juno_resource("vpc"),
-        )
+        if self.network:
+            self.vpc = self.network.vpc
+        else:
+            self.vpc = Vpc(
+                enable_dns_hostnames=True,
+                enable_dns_support=True,
+                cidr_block=self.production_cidr,
+                **juno_resource("vpc"),
+            )
 
         # Production subnet
         self.production_subnet = self.create_subnet(
@@ -270,15 +337,25 @@ class Cluster:
         )
 
         # this subnet doesn't need to ever be public
+        # the shared VPC covers the dropped CIDR already
         self.dropped_subnet = self.create_subnet(
-            "dropped", self.dropped_cidr, self.dropped_zone, private=True
+            "dropped",
+            self.dropped_cidr,
+            self.dropped_zone,
+            private=True,
+            associate=self.network is None,
         )
 
         # setup internet gateway
-        internet_gateway = InternetGateway(
-            vpc_id=self.vpc.id,
-            **juno_resource("internet-gateway", opts=dict(depends_on=[self.vpc], parent=self.vpc)),
-        )
+        if self.network:
+            internet_gateway = self.network.internet_gateway
+        else:
+            internet_gateway = InternetGateway(
+                vpc_id=self.vpc.id,
+                **juno_resource(
+                    "internet-gateway", opts=dict(depends_on=[self.vpc], parent=self.vpc)
+                ),
+            )
 
         # setup routing table
         production_route_table = RouteTable(
@@ -297,7 +374,10 @@ class Cluster:
         )
 
         if self.private:
-            nat = self.build_service_networking(internet_gateway)
+            if self.network:
+                nat = self.network.nat_gateway()
+            else:
+                nat = self.build_service_networking(internet_gateway)
             Route(
                 route_table_id=production_route_table.id,
                 destination_cidr_block="0.0.0.0/0",
@@ -326,6 +406,13 @@ class Cluster:
         """
         self.base_node_role = build_node_role(self.cluster_name, self.production_subnet)
 
+    def cluster_dns(self) -> Output:
+        """
+        Return the kube-dns service IP, the tenth address of the kubernetes service range
+        """
+        network = self.cluster.eks_cluster.kubernetes_network_config
+        return network.service_ipv4_cidr.apply(lambda cidr: str(IPv4Network(cidr)[10]))
+
     def start_cluster(self):
         """
         Start the cluster
@@ -335,6 +422,7 @@ class Cluster:
             ClusterArgs(
                 vpc_id=self.vpc.id,
                 name=self.cluster_name,
+                version=self.kubernetes_version,
                 public_subnet_ids=[],
                 private_subnet_ids=[self.production_subnet.id, self.dropped_subnet.id],
                 node_associate_public_ip_address=False,
@@ -355,17 +443,40 @@ class Cluster:
             opts=ResourceOptions(parent=self.base_node_role, provider=self.context.provider),
         )
 
+        if self.karpenter:
+            self.karpenter_values = build_karpenter(
+                self.cluster_name, self.cluster, self.base_node_role
+            )
+
+        # the providers authenticate through the token cache so they don't mint their own
+        # token for each client
+        kubeconfig = Output.all(
+            self.cluster.eks_cluster.endpoint,
+            self.cluster.eks_cluster.certificate_authority.data,
+        ).apply(
+            lambda args: cached_kubeconfig(
+                self.cluster_name,
+                args[0],
+                args[1],
+                self.context.region,
+                self.context.role_arn,
+                get_profile(),
+            )
+        )
         self.k8s_provider = k8s.Provider(
             f"{context_prefix()}-deployment-provider",
-            kubeconfig=self.cluster.kubeconfig,
+            kubeconfig=kubeconfig,
             enable_server_side_apply=True,
             opts=ResourceOptions(parent=self.cluster, depends_on=self.nodes),
         )
 
+        # ArgoCD and the bootstrap chart keep their provider, resources moving to another
+        # provider are replaced and the bootstrap app would cascade delete every addon
         self.argo_provider = k8s.Provider(
             f"{context_prefix()}-argo-provider",
             namespace="argocd",
-            kubeconfig=self.cluster.kubeconfig,
+            kubeconfig=kubeconfig,
+            enable_server_side_apply=True,
             opts=ResourceOptions(parent=self.cluster, depends_on=self.nodes),
         )
 
@@ -439,8 +550,9 @@ class Cluster:
         # deploy argocd
         argo = k8s.yaml.ConfigFile(
             f"{context_prefix()}-argocd",
-            file="https://raw.githubusercontent.com/argoproj/argo-cd/stable/manifests/install.yaml",
+            file=self.argocd.manifest,
             resource_prefix=context_prefix(),
+            transformations=self.argocd.transformations(),
             opts=ResourceOptions(parent=namespace, provider=self.argo_provider),
         )
 
@@ -467,7 +579,7 @@ class Cluster:
             f"{context_prefix()}-vpc-cni",
             cluster_name=self.cluster_name,
             addon_name="vpc-cni",
-            addon_version="v1.19.2-eksbuild.5",
+            addon_version=ADDON_VERSIONS["vpc-cni"],
             resolve_conflicts_on_create="OVERWRITE",
             opts=ResourceOptions(parent=self.cluster, provider=self.context.provider),
             configuration_values=dumps({"enableNetworkPolicy": "true"}),
@@ -477,7 +589,7 @@ class Cluster:
             f"{context_prefix()}-aws-ebs-csi-driver",
             cluster_name=self.cluster_name,
             addon_name="aws-ebs-csi-driver",
-            addon_version="v1.39.0-eksbuild.1",
+            addon_version=ADDON_VERSIONS["aws-ebs-csi-driver"],
             resolve_conflicts_on_create="OVERWRITE",
             opts=ResourceOptions(parent=self.cluster, provider=self.context.provider),
         )
@@ -486,11 +598,37 @@ class Cluster:
             f"{context_prefix()}-aws-efs-csi-driver",
             cluster_name=self.cluster_name,
             addon_name="aws-efs-csi-driver",
-            addon_version="v2.1.4-eksbuild.1",
+            addon_version=ADDON_VERSIONS["aws-efs-csi-driver"],
             resolve_conflicts_on_create="OVERWRITE",
             opts=ResourceOptions(parent=self.cluster, provider=self.context.provider),
         )
 
+        aws.eks.Addon(
+            f"{context_prefix()}-kube-proxy",
+            cluster_name=self.cluster_name,
+            addon_name="kube-proxy",
+            addon_version=cluster_addon_version(
+                "kube-proxy", self.cluster.eks_cluster.version, self.context.provider
+            ),
+            resolve_conflicts_on_create="OVERWRITE",
+            resolve_conflicts_on_update="OVERWRITE",
+            configuration_values=self.kube_proxy.configuration_values(),
+            opts=ResourceOptions(parent=self.cluster, provider=self.context.provider),
+        )
+
+        aws.eks.Addon(
+            f"{context_prefix()}-coredns",
+            cluster_name=self.cluster_name,
+            addon_name="coredns",
+            addon_version=cluster_addon_version(
+                "coredns", self.cluster.eks_cluster.version, self.context.provider
+            ),
+            resolve_conflicts_on_create="OVERWRITE",
+            resolve_conflicts_on_update="OVERWRITE",
+            configuration_values=self.coredns.configuration_values(),
+            opts=ResourceOptions(parent=self.cluster, provider=self.context.provider),
+        )
+
         chart_path = f"{os.path.dirname(__file__)}/chart"
         tag = context_prefix()
 
@@ -510,11 +648,34 @@ class Cluster:
                 "private": "true" if self.private else "false",
                 "domain": Cluster.BOOTSTRAP_DOMAIN,
                 "prefix": tag,
+                "cluster_values": {
+                    "node_groups": self.node_groups,
+                    "expander_priorities": self.expander_priorities,
+                    "gpu_sharing": self.gpu_sharing,
+                    "gpu_driver": cluster_gpu_driver(self.gpu_drivers),
+                    "cluster_dns": self.cluster_dns(),
+                    "kube_proxy_mode": self.kube_proxy.mode,
+                    "dns_autoscaler": not self.coredns.autoscaling,
+                },
             },
         )
 
+        if self.karpenter_values:
+            args["values"]["cluster_values"]["karpenter"] = self.karpenter_values
+
+        if self.efa_security_group:
+            args["values"]["cluster_values"]["efa"] = {"enabled": True}
+
+        if self.interruption_tiers:
+            args["values"]["cluster_values"]["termination_handler"] = build_termination_handler(
+                self.cluster, self.interruption_tiers
+            )
+
         # twingate setup
-        args["values"].update(self.validate_twingate())
+        twingate = self.validate_twingate()
+        if twingate:
+            args["values"].update(twingate)
+            args["values"]["cluster_values"]["twingate"] = self.twingate.values(self.node_groups)
 
         # Pulumi's k8s ConfigFile resource is not respecting the depends_on order and the
         # CRD's for ArgoCD are not being set into for the Helm Chart which causes it to
@@ -527,16 +688,37 @@ class Cluster:
             opts=ResourceOptions(parent=argo),
         )
 
-        helm.Chart(
+        CachedChart(
             f"{context_prefix()}-juno-bootstrap",
-            helm.LocalChartOpts(**args),
+            **args,
             opts=ResourceOptions(provider=self.argo_provider, depends_on=[wait], parent=argo),
         )
 
-    def add_node_group(  # noqa: PLR0917 PLR0913
+    def build_efa_security_group(self) -> Output:
+        """
+        Security group letting the EFA interfaces of the cluster reach each other
+        """
+        if self.efa_security_group is None:
+            self.efa_security_group = SecurityGroup(
+                vpc_id=self.vpc.id,
+                ingress=[SecuritySpec.SELF],
+                egress=[SecuritySpec.SELF],
+                **juno_resource("efa-sg", opts=dict(parent=self.cluster)),
+            )
+        return self.efa_security_group.id
+
+    def rollout_dependencies(self) -> List[ManagedNodeGroup]:
+        """
+        Node group the next one waits on to keep max_parallel_rollouts groups rolling at once
+        """
+        if self.max_parallel_rollouts and len(self.nodes) >= self.max_parallel_rollouts:
+            return [self.nodes[-self.max_parallel_rollouts]]
+        return []
+
+    def add_node_group(  # noqa: PLR0917 PLR0913 PLR0912 PLR0914 PLR0915
         self,
         name: str,
-        instances: List[str],
+        instances: Union[List[str], InstanceRequirements],
         capacity_type: CapacityType,
         size: int,
         maximum: int = None,
@@ -544,9 +726,58 @@ class Cluster:
         labels: Dict[str, str] = None,
         taints: List[str] = None,
         gpu: bool = False,
+        overprovision: int = 0,
+        overprovision_fraction: float = 0.5,
+        schedule: List[CapacityWindow] = None,
+        on_demand_base: int = 0,
+        interruption_grace: int = None,
+        gpu_sharing: GpuSharing = None,
+        ami_type: str = None,
+        update: NodeGroupUpdate = None,
+        placement_group: bool = False,
+        efa: bool = False,
     ):
         """
         Create a node group for the project cluster
+
+        instances is either a list of instance types or InstanceRequirements that are expanded
+        against the bundled instance catalog.
+
+        overprovision is the number of low priority pause pods kept running on the group, each
+        requesting overprovision_fraction of the smallest instance type. Real workloads preempt
+        them immediately while the autoscaler brings up a replacement node in the background.
+
+        schedule is a list of CapacityWindow's that pre-scale the group for recurring busy hours.
+        On MIXED groups they scale the spot group, within maximum - on_demand_base.
+
+        CapacityType.MIXED pairs an on-demand group holding on_demand_base nodes with a spot
+        group for everything above it. The autoscaler prefers the spot group and only grows the
+        on-demand group when spot capacity can't be acquired. The spot group is capped at
+        maximum - on_demand_base and the on-demand group at maximum, so the group stays within
+        maximum until spot runs dry. While both fall back the combined size can pass maximum by
+        the spot nodes still running.
+
+        interruption_grace is the number of seconds pods get to shut down when the node termination
+        handler drains a node ahead of a spot interruption, rebalance recommendation or scheduled
+        maintenance. Spot and mixed groups default to 90 seconds, on-demand groups are only
+        drained when it is set.
+
+        gpu_sharing selects how the GPUs of a GPU group are shared between pods. Groups without
+        one use the cluster default time slicing profile.
+
+        ami_type overrides the EKS AMI type, by default AL2_x86_64 or AL2_ARM_64 after the
+        architecture of the instances and AL2_x86_64_GPU for GPU groups. It decides whether the
+        GPU operator has to install drivers and the container toolkit on the nodes.
+
+        update is the NodeGroupUpdate policy used when a change rolls the nodes of the group,
+        one node at a time in place by default.
+
+        placement_group starts the nodes in a cluster placement group for low latency between
+        them. efa adds an Elastic Fabric Adapter interface to every node on top of it, all the
+        instance types need EFA support and the nodes are labelled for the EFA device plugin.
+
+        In Karpenter mode everything between minimum and maximum is served by a NodePool with
+        the same instances, labels, taints and capacity type.
         """
         if maximum is None:
             maximum = size
@@ -560,11 +791,94 @@ class Cluster:
         if not taints:
             taints = []
 
-        instances.sort()
+        if overprovision < 0:
+            raise ValueError("overprovision must be zero or a positive number of pods")
+
+        if not 0 < overprovision_fraction < 1:
+            raise ValueError("overprovision_fraction must be between 0 and 1")
+
+        mixed = capacity_type == Cluster.CapacityType.MIXED
+        if not 0 <= on_demand_base <= maximum:
+            raise ValueError("on_demand_base must be between zero and the node group maximum")
+
+        if on_demand_base and not mixed:
+            raise ValueError("on_demand_base is only supported on MIXED capacity node groups")
+
+        if interruption_grace is None and capacity_type != Cluster.CapacityType.ON_DEMAND:
+            interruption_grace = DEFAULT_INTERRUPTION_GRACE
+
+        if interruption_grace is not None and not 0 < interruption_grace <= MAX_INTERRUPTION_GRACE:
+            raise ValueError(
+                f"interruption_grace must be between 1 and {MAX_INTERRUPTION_GRACE} seconds"
+            )
+
+        if gpu_sharing and not gpu:
+            raise ValueError("gpu_sharing is only supported on GPU node groups")
+
+        update = update or NodeGroupUpdate()
+        update.validate()
+
+        if schedule:
+            if self.karpenter:
+                raise ValueError("Capacity windows aren't supported on Karpenter node groups")
+            # windows scale the spot half of a MIXED group
+            validate_schedule(schedule, maximum - on_demand_base if mixed else maximum)
+
+        placement_group = placement_group or efa
+        if placement_group and self.karpenter:
+            raise ValueError("Placement groups aren't supported on Karpenter node groups")
+
+        labels = {**labels, "juno-innovations.com/node-group": name}
+
+        requirements = None
+        if isinstance(instances, InstanceRequirements):
+            requirements = instances
+            requirements.efa = requirements.efa or efa
+            instances = select_instances(requirements, gpu=gpu)
+        instance_report(name, instances, requirements)
+        if efa:
+            validate_efa(instances)
+            labels = {**labels, "juno-innovations.com/efa": "true"}
+        if gpu and any(get_catalog().get(instance, {}).get("gpus") == 0 for instance in instances):
+            print(f"\tWarning: GPU node group {name} includes instance types without a GPU")
+        ami_type = node_ami_type(instance_architecture(instances), gpu, ami_type)
+
+        # GPU drivers either ship with the AMI or are installed by the GPU operator
+        if gpu:
+            driver = gpu_driver(ami_type)
+            self.gpu_drivers.append(driver)
+            print(f"\tGPU Driver: {driver}")
+            if driver == "ami":
+                labels = {
+                    **labels,
+                    "nvidia.com/gpu.deploy.driver": "false",
+                    "nvidia.com/gpu.deploy.container-toolkit": "false",
+                }
+
+        # the device plugin picks its config from the node label
+        if gpu_sharing:
+            gpu_sharing.validate(instances)
+            labels = {**labels, **gpu_sharing.labels}
+            self.gpu_sharing[gpu_sharing.name] = gpu_sharing.config()
+            print(f"\tGPU Sharing: {gpu_sharing.name}")
+
+        # warm headroom pods are deployed by the bootstrap chart
+        group = {"name": name, "taints": taints}
+        if overprovision:
+            shape = smallest_shape(instances)
+            group["overprovision"] = {
+                "replicas": overprovision,
+                "cpu": f"{int(shape['vcpu'] * 1000 * overprovision_fraction)}m",
+                "memory": f"{int(shape['memory'] * 1024 * overprovision_fraction)}Mi",
+            }
+        self.node_groups.append(group)
+
+        # selected types keep their ranking, EKS launches on-demand capacity in list order. Listed
+        # types stay sorted as they always were, reordering them replaces the node group
+        instances = list(instances) if requirements else sorted(instances)
         args = dict(
             cluster=self.cluster,
             node_role_arn=self.base_node_role.arn,
-            capacity_type=capacity_type.value,
             instance_types=instances,
             disk_size=150,
             subnet_ids=[self.production_subnet.id],
@@ -573,11 +887,6 @@ class Cluster:
                 NodeGroupTaintArgs(effect="NO_SCHEDULE", key=taint, value="true")
                 for taint in taints
             ],
-            scaling_config={
-                "desired_size": size,
-                "min_size": minimum,
-                "max_size": maximum,
-            },
             tags={
                 "Name": f"{context_prefix()}-{name}-node",
                 "region": self.context.region,
@@ -585,17 +894,110 @@ class Cluster:
                 "k8s.io/cluster-autoscaler/enabled": "true",
                 f"k8s.io/cluster-autoscaler/{self.cluster_name}": "owned",
             },
-            ami_type="AL2_x86_64",
+            ami_type=ami_type,
         )
 
         if gpu:
-            args["ami_type"] = "AL2_x86_64_GPU"
             args["disk_size"] = 70
 
-        self.nodes.append(
-            ManagedNodeGroup(
-                f"{context_prefix()}-{name}-nodes",
-                ManagedNodeGroupArgs(**args),
-                opts=ResourceOptions(depends_on=self.cluster, parent=self.cluster),
+        if update.force:
+            args["force_update_version"] = True
+        print(f"\tUpdate: {update}")
+
+        # the root volume moves into the launch template of placement groups
+        disk_size = args["disk_size"]
+        placement = None
+        if placement_group:
+            placement = "efa" if efa else "cluster"
+            args["launch_template"] = build_placement_template(
+                name,
+                self.cluster,
+                args.pop("disk_size"),
+                self.build_efa_security_group() if efa else None,
             )
-        )
+            print(f"\tPlacement Group: {placement}")
+
+        # (suffix, capacity type, minimum, size, maximum, autoscaler priority)
+        groups = [("", capacity_type, minimum, size, maximum, PRIORITY_PREFERRED)]
+        if mixed:
+            spot = (
+                max(minimum - on_demand_base, 0),
+                max(size - on_demand_base, 0),
+                maximum - on_demand_base,
+            )
+            groups = [
+                ("-spot", Cluster.CapacityType.SPOT, *spot, PRIORITY_PREFERRED),
+                (
+                    "-on-demand",
+                    Cluster.CapacityType.ON_DEMAND,
+                    on_demand_base,
+                    on_demand_base,
+                    maximum,
+                    PRIORITY_FALLBACK,
+                ),
+            ]
+            # an on-demand base of the whole maximum leaves nothing for spot
+            groups = [group for group in groups if group[4]]
+
+        if self.karpenter:
+            if maximum > minimum:
+                group["karpenter"] = node_pool(
+                    instances,
+                    capacity_type.value,
+                    maximum - minimum,
+                    labels,
+                    disk_size,
+                    {
+                        "Name": f"{context_prefix()}-{name}-node",
+                        "region": self.context.region,
+                        "workload-type": name,
+                    },
+                    gpu=gpu,
+                )
+
+            # the minimum stays a fixed managed node group so the controller can always run
+            minimum = max(minimum, on_demand_base)
+            if not minimum:
+                return
+            if labels.get(KARPENTER_NODE_LABEL) == "true":
+                self.karpenter_nodes += minimum
+            capacity_type = Cluster.CapacityType.ON_DEMAND if mixed else capacity_type
+            groups = [("", capacity_type, minimum, minimum, minimum, PRIORITY_PREFERRED)]
+
+        for suffix, capacity, group_minimum, group_size, group_maximum, priority in groups:
+            group_args = dict(**args, capacity_type=capacity.value)
+            group_name = f"{context_prefix()}-{name}{suffix}-nodes"
+            node_group = ManagedNodeGroup(
+                group_name,
+                ManagedNodeGroupArgs(
+                    **group_args,
+                    node_group_name=update.group_name(
+                        group_name, {**group_args, "disk_size": disk_size, "placement": placement}
+                    ),
+                    scaling_config={
+                        "desired_size": group_size,
+                        "min_size": group_minimum,
+                        "max_size": group_maximum,
+                    },
+                ),
+                opts=ResourceOptions(
+                    depends_on=[self.cluster, *self.rollout_dependencies()],
+                    parent=self.cluster,
+                    transforms=update.transforms,
+                ),
+            )
+            self.nodes.append(node_group)
+
+            # Karpenter handles interruptions for its own nodes
+            if interruption_grace and not self.karpenter:
+                tier = self.interruption_tiers.setdefault(interruption_grace, {})
+                tier[f"{name}{suffix}"] = node_group
+
+            # managed node group ASGs are named eks-<node group name>-<uuid>
+            self.expander_priorities.setdefault(str(priority), []).append(
+                f"eks-{context_prefix()}-{name}{suffix}-nodes-.*"
+            )
+
+            # busy hours are served by the preferred capacity, on-demand stays a fallback
+            if schedule and priority == PRIORITY_PREFERRED:
+                build_capacity_schedule(f"{name}{suffix}", node_group, schedule, group_minimum)
@@ -12,8 +12,19 @@ from ..account import eks_node_role
 from ..provider import set_account
 from .session import get_session
 
-# Juno org
-organization = aws.organizations.get_organization()
+# Juno org, looked up on first use so importing the package doesn't need the engine
+ORGANIZATION = None
+
+
+def get_organization():
+    """
+    Return the Juno organization
+    """
+    global ORGANIZATION
+    if ORGANIZATION is None:
+        ORGANIZATION = aws.organizations.get_organization()
+    return ORGANIZATION
+
 
 # account hooks
 # these are functions that will be called when the account is initialized
@@ -34,7 +45,9 @@ class JunoAccount:
     def __init__(self, account: str):
         # instance variables
         self.account = "root" if account == JunoAccount.ROOT_ACCOUNT else account
-        self.account_object = [acct for acct in organization.accounts if acct.name == account][0]
+        self.account_object = [
+            acct for acct in get_organization().accounts if acct.name == account
+        ][0]
         self.account_id = self.account_object.id
 
         args = dict(allowed_account_ids=[self.account_id])
@@ -2,14 +2,18 @@
 Handle region switching in the Juno AWS Organizations
 """
 
+# std
+from typing import List, Union
+
 # 3rd
-from pulumi import ResourceOptions, get_stack
+from pulumi import ResourceOptions, InvokeOptions, get_stack
 import pulumi_aws as aws
 
 # local
 from ..exceptions import ContextNotSet
 from ..provider import set_context, get_account
 from ..ecr import set_ecr
+from ..network import RegionNetwork
 from .session import get_session, get_profile
 
 
@@ -19,10 +23,25 @@ from .session import get_session, get_profile
 # a specific stack, you can do that.
 REGION_HOOKS = {}
 PROVIDERS = {}
+ZONES = {}
+NETWORKS = {}
 
 
 class JunoRegion:
-    def __init__(self, region: str, ecr_master: bool = False, ecr_sync: bool = False):
+    def __init__(
+        self,
+        region: str,
+        ecr_master: bool = False,
+        ecr_sync: bool = False,
+        shared_network: bool = False,
+    ):
+        """
+        Setup a region of the current account
+
+        With shared_network the VPC, internet gateway, NAT gateway and EFS are built once
+        for the region and its clusters attach to them with their own subnets and route
+        tables, the clusters share the filesystem.
+        """
         account = get_account()
 
         # instance variables
@@ -31,6 +50,8 @@ class JunoRegion:
         self.region = region
         self.account = account.account
         self.context_only = False
+        self.shared_network = shared_network
+        self.network: Union[RegionNetwork, None] = None
         self.account_id = account.account_id
         self.role_arn = f"arn:aws:iam::{self.account_id}:role/OrganizationAccountAccessRole"
 
@@ -40,7 +61,7 @@ class JunoRegion:
                 role_arn=self.role_arn, session_name=get_session()
             )
 
-        tag = f"{self.account}-{self.region}-provider"
+        self.tag = tag = f"{self.account}-{self.region}-provider"
         if tag not in PROVIDERS:
             PROVIDERS[tag] = aws.Provider(
                 f"{self.account}-{self.region}-provider",
@@ -53,6 +74,17 @@ class JunoRegion:
         self.provider = PROVIDERS[tag]
         self.partition = account.partition
 
+    @property
+    def availability_zones(self) -> List[str]:
+        """
+        Available zones of the region, looked up once per region provider
+        """
+        if self.tag not in ZONES:
+            ZONES[self.tag] = aws.get_availability_zones(
+                state="available", opts=InvokeOptions(provider=self.provider)
+            ).names
+        return ZONES[self.tag]
+
     def __enter__(self):
         # fail if the context isn't set
         if self.account is None:
@@ -60,6 +92,13 @@ class JunoRegion:
 
         # set region context
         set_context(self)
+
+        # shared network and storage
+        if self.shared_network:
+            if self.tag not in NETWORKS:
+                NETWORKS[self.tag] = RegionNetwork(self.availability_zones[0])
+            self.network = NETWORKS[self.tag]
+
         if self.context_only:
             return self
 
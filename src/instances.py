@@ -0,0 +1,209 @@
+"""
+Offline EC2 instance type catalog
+"""
+
+# std
+import os
+from json import loads
+from typing import Dict, List, Optional, Tuple
+
+
+CATALOG: Dict[str, Dict] = {}
+
+
+def get_catalog() -> Dict[str, Dict]:
+    """
+    Load the bundled instance type catalog
+    """
+    if not CATALOG:
+        catalog = os.path.abspath(f"{__file__}/../catalog/instances.json")
+        with open(catalog, "r", encoding="utf-8") as catalog_file:
+            CATALOG.update(loads(catalog_file.read()))
+    return CATALOG
+
+
+def get_instance_type(name: str) -> Dict:
+    """
+    Get the specs for an instance type
+    """
+    spec = get_catalog().get(name)
+    if spec is None:
+        raise ValueError(f"Instance type {name} is not in the instance catalog")
+    return spec
+
+
+def instance_architecture(instances: List[str]) -> str:
+    """
+    Return the architecture of a list of instance types, types outside the catalog are skipped
+    """
+    architectures = {
+        get_catalog()[instance]["architecture"]
+        for instance in instances
+        if instance in get_catalog()
+    }
+    if len(architectures) > 1:
+        raise ValueError(f"Instance types mix architectures: {', '.join(sorted(architectures))}")
+    return architectures.pop() if architectures else "x86_64"
+
+
+def smallest_shape(instances: List[str]) -> Dict[str, int]:
+    """
+    Return the vCPU and memory that fit on every instance type in the list
+    """
+    specs = [get_instance_type(instance) for instance in instances]
+    return {
+        "vcpu": min(spec["vcpu"] for spec in specs),
+        "memory": min(spec["memory"] for spec in specs),
+    }
+
+
+def largest_shape(instances: List[str]) -> Dict[str, int]:
+    """
+    Return the largest vCPU and memory any instance type in the list provides
+    """
+    specs = [get_instance_type(instance) for instance in instances]
+    return {
+        "vcpu": max(spec["vcpu"] for spec in specs),
+        "memory": max(spec["memory"] for spec in specs),
+    }
+
+
+class InstanceRequirements:
+    """
+    Describe the instances a node group needs instead of listing them by hand
+
+    vcpu and memory (GiB) are inclusive (minimum, maximum) ranges, a maximum of None means
+    unbounded. gpus is the minimum GPU count, gpu_models limits the GPU models that qualify.
+    local_nvme requires (True) or rejects (False) instance store volumes. efa only selects
+    types with an Elastic Fabric Adapter. generation is the oldest instance generation allowed.
+    limit caps the number of selected types and max_per_family spreads them across families for
+    deeper spot pools.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        vcpu: Tuple[int, Optional[int]] = (1, None),
+        memory: Tuple[int, Optional[int]] = (0, None),
+        gpus: int = None,
+        gpu_models: List[str] = None,
+        architecture: str = "x86_64",
+        local_nvme: bool = None,
+        efa: bool = False,
+        generation: int = None,
+        exclude_families: List[str] = None,
+        limit: int = 10,
+        max_per_family: int = 2,
+    ):
+        self.vcpu = vcpu
+        self.memory = memory
+        self.gpus = gpus
+        self.gpu_models = [model.lower() for model in gpu_models or []]
+        self.architecture = architecture
+        self.local_nvme = local_nvme
+        self.efa = efa
+        self.generation = generation
+        self.exclude_families = exclude_families or []
+        self.limit = limit
+        self.max_per_family = max_per_family
+
+    def __str__(self):
+        parts = [
+            f"vCPU {_format_range(self.vcpu)}",
+            f"memory {_format_range(self.memory)} GiB",
+            self.architecture,
+        ]
+        if self.gpus:
+            parts.append(f"gpus >= {self.gpus}")
+        if self.gpu_models:
+            parts.append(f"gpu models {', '.join(self.gpu_models)}")
+        if self.local_nvme is not None:
+            parts.append("local nvme" if self.local_nvme else "no local nvme")
+        if self.efa:
+            parts.append("efa")
+        if self.generation:
+            parts.append(f"generation >= {self.generation}")
+        if self.exclude_families:
+            parts.append(f"excluding {', '.join(self.exclude_families)}")
+        return ", ".join(parts)
+
+    def matches(self, name: str, spec: Dict, gpu: bool) -> bool:  # noqa: PLR0911
+        """
+        Check an instance type against the requirements
+        """
+        family = name.split(".")[0]
+        gpus = self.gpus if self.gpus is not None else (1 if gpu else 0)
+        if family in self.exclude_families:
+            return False
+        if spec["architecture"] != self.architecture:
+            return False
+        if not _in_range(spec["vcpu"], self.vcpu) or not _in_range(spec["memory"], self.memory):
+            return False
+        # CPU only groups never get GPU instances and GPU groups never get CPU only instances
+        if spec["gpus"] < gpus or (not gpus and spec["gpus"]):
+            return False
+        if self.gpu_models and spec["gpu_model"] not in self.gpu_models:
+            return False
+        if self.local_nvme is not None and bool(spec["local_nvme"]) != self.local_nvme:
+            return False
+        if self.efa and not spec.get("efa"):
+            return False
+        return not self.generation or spec["generation"] >= self.generation
+
+
+def _in_range(value: int, bounds: Tuple[int, Optional[int]]) -> bool:
+    low, high = bounds
+    return value >= low and (high is None or value <= high)
+
+
+def _format_range(bounds: Tuple[int, Optional[int]]) -> str:
+    low, high = bounds
+    return f"{low}+" if high is None else f"{low}-{high}"
+
+
+def select_instances(requirements: InstanceRequirements, gpu: bool = False) -> List[str]:
+    """
+    Expand requirements into a ranked and diversified list of instance types
+
+    Candidates are ranked by the smallest fit first, then the newest generation. They are then
+    picked round robin across families so a single family shortage can't stall a scale up.
+    """
+    candidates = sorted(
+        (
+            (spec["vcpu"], spec["memory"], -spec["generation"], name)
+            for name, spec in get_catalog().items()
+            if requirements.matches(name, spec, gpu)
+        ),
+    )
+    if not candidates:
+        raise ValueError(f"No instance types in the catalog match: {requirements}")
+
+    families: Dict[str, List[str]] = {}
+    for *_, name in candidates:
+        families.setdefault(name.split(".")[0], []).append(name)
+
+    selected = []
+    for rank in range(requirements.max_per_family):
+        for names in families.values():
+            if rank < len(names) and len(selected) < requirements.limit:
+                selected.append(names[rank])
+    return selected
+
+
+def instance_report(name: str, instances: List[str], requirements: InstanceRequirements = None):
+    """
+    Print the instance types picked for a node group
+    """
+    print(f"Node Group: {name}")
+    if requirements:
+        print(f"\tRequirements: {requirements}")
+    for instance in instances:
+        spec = get_catalog().get(instance)
+        if spec is None:
+            print(f"\t{instance}: not in the instance catalog")
+            continue
+        details = f"{spec['vcpu']} vCPU, {spec['memory']} GiB"
+        if spec.get("gpus"):
+            details = f"{details}, {spec['gpus']}x {spec['gpu_model']}"
+        if spec.get("local_nvme"):
+            details = f"{details}, {spec['local_nvme']} GB nvme"
+        print(f"\t{instance}: {details}")
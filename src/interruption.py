@@ -0,0 +1,164 @@
+"""
+EC2 interruption event queue
+"""
+
+# std
+from json import dumps
+from typing import Dict
+
+# 3rd
+from pulumi import Resource
+from pulumi_aws.sqs import Queue, QueuePolicy
+from pulumi_aws.cloudwatch import EventRule, EventTarget
+from pulumi_aws.iam import RolePolicy
+from pulumi_aws.autoscaling import Tag
+from pulumi_eks import Cluster as EksCluster, ManagedNodeGroup
+
+# local
+from .irsa import build_service_account_role
+from .node_group import autoscaling_group_name
+from .provider import juno_resource
+
+
+# EventBridge patterns for the events that take a node away from the cluster
+INTERRUPTION_EVENTS = {
+    "spot-interruption": {
+        "source": ["aws.ec2"],
+        "detail-type": ["EC2 Spot Instance Interruption Warning"],
+    },
+    "rebalance": {
+        "source": ["aws.ec2"],
+        "detail-type": ["EC2 Instance Rebalance Recommendation"],
+    },
+    "state-change": {
+        "source": ["aws.ec2"],
+        "detail-type": ["EC2 Instance State-change Notification"],
+    },
+    "scheduled-change": {
+        "source": ["aws.health"],
+        "detail-type": ["AWS Health Event"],
+    },
+}
+
+
+def build_interruption_queue(name: str, parent: Resource) -> Queue:
+    """
+    Build an SQS queue fed by EventBridge with the EC2 interruption events
+    """
+    queue = Queue(
+        message_retention_seconds=300,
+        sqs_managed_sse_enabled=True,
+        **juno_resource(f"{name}-queue", opts=dict(parent=parent)),
+    )
+
+    QueuePolicy(
+        queue_url=queue.id,
+        policy=queue.arn.apply(
+            lambda arn: dumps({
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Principal": {"Service": ["events.amazonaws.com", "sqs.amazonaws.com"]},
+                        "Action": "sqs:SendMessage",
+                        "Resource": arn,
+                    }
+                ],
+            })
+        ),
+        **juno_resource(f"{name}-queue-policy", opts=dict(parent=queue), no_tags=True),
+    )
+
+    for event, pattern in INTERRUPTION_EVENTS.items():
+        rule = EventRule(
+            event_pattern=dumps(pattern),
+            **juno_resource(f"{name}-{event}-rule", opts=dict(parent=queue)),
+        )
+        EventTarget(
+            rule=rule.name,
+            arn=queue.arn,
+            **juno_resource(f"{name}-{event}-target", opts=dict(parent=rule), no_tags=True),
+        )
+
+    return queue
+
+
+TERMINATION_HANDLER_NAMESPACE = "kube-system"
+
+# spot instances get a two minute warning, the drain has to finish inside of it
+MAX_INTERRUPTION_GRACE = 120
+DEFAULT_INTERRUPTION_GRACE = 90
+
+
+def termination_handler_policy(queue_arn: str) -> str:
+    """
+    Permissions the node termination handler needs to consume its queue
+    """
+    return dumps({
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Action": [
+                    "autoscaling:CompleteLifecycleAction",
+                    "autoscaling:DescribeAutoScalingInstances",
+                    "autoscaling:DescribeTags",
+                    "ec2:DescribeInstances",
+                ],
+                "Resource": "*",
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["sqs:DeleteMessage", "sqs:ReceiveMessage"],
+                "Resource": queue_arn,
+            },
+        ],
+    })
+
+
+def build_termination_handler(
+    cluster: EksCluster, tiers: Dict[int, Dict[str, ManagedNodeGroup]]
+) -> Dict:
+    """
+    Build a queue mode node termination handler for each interruption grace period
+
+    Each tier only drains the autoscaling groups carrying its managed tag so node groups can
+    give their pods a different amount of time to finish. Returns the bootstrap chart values.
+    """
+    handlers = []
+    for grace, node_groups in sorted(tiers.items()):
+        name = f"nth-{grace}s"
+        service_account = f"aws-node-termination-handler-{grace}s"
+        managed_tag = f"aws-node-termination-handler/managed-{grace}s"
+
+        queue = build_interruption_queue(name, cluster)
+        role = build_service_account_role(
+            f"{name}-role", cluster, TERMINATION_HANDLER_NAMESPACE, service_account
+        )
+        RolePolicy(
+            role=role.id,
+            policy=queue.arn.apply(termination_handler_policy),
+            **juno_resource(f"{name}-policy", opts=dict(parent=role), no_tags=True),
+        )
+
+        # managed node groups don't copy their tags to the autoscaling group, the handler looks
+        # for the tag on the instance so it has to propagate at launch
+        for group_name, node_group in node_groups.items():
+            Tag(
+                autoscaling_group_name=autoscaling_group_name(node_group),
+                tag={"key": managed_tag, "value": "true", "propagate_at_launch": True},
+                **juno_resource(
+                    f"{group_name}-{name}-tag", opts=dict(parent=node_group), no_tags=True
+                ),
+            )
+
+        handlers.append({
+            "name": f"{grace}s",
+            "grace": grace,
+            "service_account": service_account,
+            "managed_tag": managed_tag,
+            "queue_url": queue.url,
+            "role_arn": role.arn,
+        })
+
+    return {"enabled": True, "handlers": handlers}
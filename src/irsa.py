@@ -0,0 +1,56 @@
+"""
+IAM roles for Kubernetes service accounts
+"""
+
+# std
+from json import dumps
+
+# 3rd
+from pulumi_aws.iam import Role
+from pulumi_eks import Cluster as EksCluster
+
+# local
+from .provider import juno_resource, get_context
+
+
+def service_account_trust_policy(
+    account_id: str, issuer: str, namespace: str, service_account: str
+) -> str:
+    """
+    Trust policy letting a service account assume a role through the cluster OIDC provider
+    """
+    issuer = issuer.replace("https://", "")
+    return dumps({
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": {"Federated": f"arn:aws:iam::{account_id}:oidc-provider/{issuer}"},
+                "Action": "sts:AssumeRoleWithWebIdentity",
+                "Condition": {
+                    "StringEquals": {
+                        f"{issuer}:aud": "sts.amazonaws.com",
+                        f"{issuer}:sub": f"system:serviceaccount:{namespace}:{service_account}",
+                    }
+                },
+            }
+        ],
+    })
+
+
+def build_service_account_role(
+    name: str, cluster: EksCluster, namespace: str, service_account: str
+) -> Role:
+    """
+    Build a role assumable by a service account in the cluster
+    """
+    context = get_context()
+    issuer = cluster.eks_cluster.identities[0].oidcs[0].issuer
+    return Role(
+        assume_role_policy=issuer.apply(
+            lambda url: service_account_trust_policy(
+                context.account_id, url, namespace, service_account
+            )
+        ),
+        **juno_resource(name, opts=dict(parent=cluster)),
+    )
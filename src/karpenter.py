@@ -0,0 +1,149 @@
+"""
+Karpenter provisioning for a cluster
+"""
+
+# std
+from json import dumps
+from typing import Dict, List
+
+# 3rd
+from pulumi import Output
+from pulumi_aws.iam import Role, RolePolicy
+from pulumi_eks import Cluster as EksCluster
+
+# local
+from .instances import largest_shape
+from .interruption import build_interruption_queue
+from .irsa import build_service_account_role
+from .provider import juno_resource, get_context
+
+
+KARPENTER_NAMESPACE = "kube-system"
+KARPENTER_SERVICE_ACCOUNT = "karpenter"
+# the controller is pinned to the service nodes by the bootstrap chart
+KARPENTER_NODE_LABEL = "juno-innovations.com/service"
+
+# Karpenter always launches spot first when a NodePool allows both capacity types
+CAPACITY_TYPES = {
+    "SPOT": ["spot"],
+    "ON_DEMAND": ["on-demand"],
+    "MIXED": ["spot", "on-demand"],
+}
+
+
+def controller_policy(region: str, queue_arn: str, node_role_arn: str, cluster_arn: str) -> str:
+    """
+    Permissions the Karpenter controller needs to launch and reclaim nodes
+    """
+    return dumps({
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Action": [
+                    "ec2:DescribeAvailabilityZones",
+                    "ec2:DescribeImages",
+                    "ec2:DescribeInstances",
+                    "ec2:DescribeInstanceTypeOfferings",
+                    "ec2:DescribeInstanceTypes",
+                    "ec2:DescribeLaunchTemplates",
+                    "ec2:DescribeSecurityGroups",
+                    "ec2:DescribeSpotPriceHistory",
+                    "ec2:DescribeSubnets",
+                    "ec2:RunInstances",
+                    "ec2:CreateFleet",
+                    "ec2:CreateLaunchTemplate",
+                    "ec2:CreateTags",
+                    "pricing:GetProducts",
+                ],
+                "Resource": "*",
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["ec2:TerminateInstances", "ec2:DeleteLaunchTemplate"],
+                "Resource": "*",
+                "Condition": {"StringLike": {"ec2:ResourceTag/karpenter.sh/nodepool": "*"}},
+            },
+            {
+                "Effect": "Allow",
+                "Action": [
+                    "iam:GetInstanceProfile",
+                    "iam:CreateInstanceProfile",
+                    "iam:TagInstanceProfile",
+                    "iam:AddRoleToInstanceProfile",
+                    "iam:RemoveRoleFromInstanceProfile",
+                    "iam:DeleteInstanceProfile",
+                ],
+                "Resource": "*",
+            },
+            {"Effect": "Allow", "Action": "iam:PassRole", "Resource": node_role_arn},
+            {"Effect": "Allow", "Action": "eks:DescribeCluster", "Resource": cluster_arn},
+            {
+                "Effect": "Allow",
+                "Action": "ssm:GetParameter",
+                "Resource": f"arn:aws:ssm:{region}::parameter/aws/service/*",
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["sqs:DeleteMessage", "sqs:GetQueueUrl", "sqs:ReceiveMessage"],
+                "Resource": queue_arn,
+            },
+        ],
+    })
+
+
+def build_karpenter(cluster_name: str, cluster: EksCluster, node_role: Role) -> Dict:
+    """
+    Build the AWS resources for Karpenter and return the bootstrap chart values
+    """
+    context = get_context()
+    queue = build_interruption_queue("karpenter-interruption", cluster)
+    controller_role = build_service_account_role(
+        "karpenter-controller-role", cluster, KARPENTER_NAMESPACE, KARPENTER_SERVICE_ACCOUNT
+    )
+
+    RolePolicy(
+        role=controller_role.id,
+        policy=Output.all(queue.arn, node_role.arn, cluster.eks_cluster.arn).apply(
+            lambda args: controller_policy(context.region, *args)
+        ),
+        **juno_resource(
+            "karpenter-controller-policy", opts=dict(parent=controller_role), no_tags=True
+        ),
+    )
+
+    return {
+        "enabled": True,
+        "cluster_name": cluster_name,
+        "role_arn": controller_role.arn,
+        "queue": queue.name,
+        "node_role": node_role.name,
+        "security_group": cluster.eks_cluster.vpc_config.cluster_security_group_id,
+    }
+
+
+def node_pool(  # noqa: PLR0913 PLR0917
+    instances: List[str],
+    capacity_type: str,
+    nodes: int,
+    labels: Dict[str, str],
+    disk_size: int,
+    tags: Dict[str, str],
+    gpu: bool = False,
+) -> Dict:
+    """
+    Translate a node group declaration into the values for a NodePool and EC2NodeClass
+    """
+    shape = largest_shape(instances)
+    return {
+        "instances": instances,
+        "capacity_types": CAPACITY_TYPES[capacity_type],
+        "gpu": gpu,
+        "labels": labels,
+        "disk_size": f"{disk_size}Gi",
+        "tags": tags,
+        "limits": {
+            "cpu": shape["vcpu"] * nodes,
+            "memory": f"{shape['memory'] * nodes}Gi",
+        },
+    }
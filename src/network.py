@@ -0,0 +1,207 @@
+"""
+Network and storage layer of a region
+
+Builds the VPC, internet gateway and EFS of a region once so every Cluster in the region
+attaches to them with its own subnets and route tables. The NAT gateway is only built
+when the first private cluster needs it.
+"""
+
+# std
+from typing import Tuple, Union
+from contextlib import contextmanager
+
+# 3rd
+from pulumi_aws.ec2 import (
+    Subnet,
+    NatGateway,
+    Eip,
+    VpcIpv4CidrBlockAssociation,
+    RouteTable,
+    InternetGateway,
+    RouteTableAssociation,
+    Route,
+)
+from pulumi_aws.ec2.vpc import Vpc
+from pulumi_aws.efs import FileSystem, MountTarget
+from pulumi_aws.ec2.security_group import SecurityGroup
+
+# local
+from .provider import juno_resource, get_cluster, set_cluster
+from .security import SecuritySpec
+
+
+def create_subnet(  # noqa: PLR0913 PLR0917
+    vpc: Vpc, name: str, cidr: str, zone: str, private: bool = False, associate: bool = True
+) -> Subnet:
+    """
+    Create a subnet, associating its CIDR with the VPC first
+    """
+    parent = vpc
+    if associate:
+        association = VpcIpv4CidrBlockAssociation(
+            vpc_id=vpc.id,
+            cidr_block=cidr,
+            **juno_resource(
+                f"{name}-association",
+                opts=dict(depends_on=[vpc], parent=vpc),
+                no_tags=True,
+            ),
+        )
+        parent = association
+
+    return Subnet(
+        vpc_id=vpc.id,
+        cidr_block=cidr,
+        map_public_ip_on_launch=not private,
+        availability_zone=zone,
+        **juno_resource(name, opts=dict(depends_on=[parent], parent=parent)),
+    )
+
+
+def build_nat_gateway(  # noqa: PLR0913 PLR0917
+    vpc: Vpc,
+    internet_gateway: InternetGateway,
+    cidr: str,
+    zone: str,
+    associate: bool = True,
+) -> NatGateway:
+    """
+    Build the public service subnet and the NAT gateway private subnets route through
+    """
+    # service subnet needs to have public access so traffic can be
+    # routed through the NAT gateway
+    service_subnet = create_subnet(vpc, "service", cidr, zone, private=False, associate=associate)
+
+    # service subnet which has internet for the NAT
+    eip = Eip(
+        **juno_resource(
+            "nat-eip", opts=dict(depends_on=[internet_gateway], parent=internet_gateway)
+        ),
+    )
+    service_route_table = RouteTable(
+        vpc_id=vpc.id,
+        **juno_resource("service-routing-table", opts=dict(parent=service_subnet)),
+    )
+    Route(
+        route_table_id=service_route_table.id,
+        destination_cidr_block="0.0.0.0/0",
+        gateway_id=internet_gateway.id,
+        **juno_resource(
+            "service-internet-gateway-route",
+            opts=dict(parent=service_route_table),
+            no_tags=True,
+        ),
+    )
+    RouteTableAssociation(
+        route_table_id=service_route_table.id,
+        subnet_id=service_subnet.id,
+        **juno_resource(
+            "service-connect-routing-association",
+            opts=dict(parent=service_route_table),
+            no_tags=True,
+        ),
+    )
+
+    return NatGateway(
+        subnet_id=service_subnet.id,
+        allocation_id=eip.id,
+        **juno_resource("nat-gateway", opts=dict(depends_on=[eip], parent=eip)),
+    )
+
+
+@contextmanager
+def region_scope():
+    """
+    Name resources after the region instead of the current cluster
+    """
+    cluster = get_cluster()
+    set_cluster(None)
+    try:
+        yield
+    finally:
+        set_cluster(cluster)
+
+
+class RegionNetwork:
+    """
+    VPC, internet gateway and EFS shared by the clusters of a region
+    """
+
+    CIDR = "192.168.0.0/16"
+    SERVICE_CIDR = "192.168.130.0/24"
+    STORAGE_CIDR = "192.168.131.0/24"
+
+    # production and dropped CIDR of each cluster
+    CLUSTER_CIDRS = {
+        "private": ("192.168.0.0/18", "192.168.128.0/24"),
+        "public": ("192.168.64.0/18", "192.168.129.0/24"),
+    }
+
+    def __init__(self, production_zone: str):
+        """
+        Build the region layer, called in the region context
+        """
+        self.production_zone = production_zone
+        self.nat: Union[NatGateway, None] = None
+
+        self.vpc = Vpc(
+            enable_dns_hostnames=True,
+            enable_dns_support=True,
+            cidr_block=self.CIDR,
+            **juno_resource("vpc"),
+        )
+        self.internet_gateway = InternetGateway(
+            vpc_id=self.vpc.id,
+            **juno_resource("internet-gateway", opts=dict(depends_on=[self.vpc], parent=self.vpc)),
+        )
+
+        # one zone EFS takes a single mount target, it gets a subnet of its own that every
+        # cluster in the VPC reaches
+        self.file_system = FileSystem(
+            availability_zone_name=production_zone,
+            **juno_resource("efs"),
+        )
+        storage_subnet = create_subnet(
+            self.vpc, "storage", self.STORAGE_CIDR, production_zone, private=True, associate=False
+        )
+        MountTarget(
+            subnet_id=storage_subnet.id,
+            file_system_id=self.file_system.id,
+            security_groups=[
+                SecurityGroup(
+                    vpc_id=self.vpc.id,
+                    ingress=[SecuritySpec.OPEN],
+                    egress=[SecuritySpec.OPEN],
+                    **juno_resource(
+                        "efs-mount-sg",
+                        opts=dict(depends_on=[self.file_system], parent=self.file_system),
+                    ),
+                ).id
+            ],
+            **juno_resource(
+                "efs-mount",
+                opts=dict(depends_on=[self.file_system, storage_subnet], parent=self.file_system),
+                no_tags=True,
+            ),
+        )
+
+    def cluster_cidrs(self, private: bool) -> Tuple[str, str]:
+        """
+        Production and dropped CIDR of a cluster
+        """
+        return self.CLUSTER_CIDRS["private" if private else "public"]
+
+    def nat_gateway(self) -> NatGateway:
+        """
+        NAT gateway of the region, built on first use
+        """
+        if self.nat is None:
+            with region_scope():
+                self.nat = build_nat_gateway(
+                    self.vpc,
+                    self.internet_gateway,
+                    self.SERVICE_CIDR,
+                    self.production_zone,
+                    associate=False,
+                )
+        return self.nat
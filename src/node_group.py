@@ -0,0 +1,411 @@
+"""
+Managed node group helpers
+"""
+
+# std
+import json
+import hashlib
+from enum import Enum
+from typing import Dict, List, Union
+
+# 3rd
+from pulumi import Output, ResourceTransformArgs, ResourceTransformResult
+from pulumi_aws.autoscaling import Schedule
+from pulumi_aws.ec2 import PlacementGroup, LaunchTemplate
+from pulumi_aws.eks import NodeGroupLaunchTemplateArgs
+from pulumi_eks import ManagedNodeGroup, Cluster as EksCluster
+
+# local
+from .instances import get_catalog
+from .provider import juno_resource
+
+
+# cluster-autoscaler priority expander tiers, on-demand halves of MIXED groups are fallbacks
+PRIORITY_PREFERRED = 50
+PRIORITY_FALLBACK = 10
+
+
+def autoscaling_group_name(node_group: ManagedNodeGroup) -> Output:
+    """
+    Return the name of the autoscaling group EKS created for a managed node group
+    """
+    return node_group.node_group.apply(lambda group: group.resources).apply(
+        lambda resources: resources[0].autoscaling_groups[0].name
+    )
+
+
+class CapacityWindow:
+    """
+    Recurring window where a node group is pre-scaled ahead of demand
+
+    start and end are cron expressions evaluated in time_zone. When the window opens the
+    autoscaling group is raised to minimum/size. When it closes only the minimum is restored,
+    the cluster-autoscaler then drains the extra nodes once they are idle.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        start: str,
+        end: str,
+        minimum: int,
+        size: int = None,
+        time_zone: str = "UTC",
+        name: str = None,
+    ):
+        self.start = start
+        self.end = end
+        self.minimum = minimum
+        self.size = minimum if size is None else size
+        self.time_zone = time_zone
+        self.name = name
+
+    def validate(self, maximum: int):
+        """
+        Validate the window against the node group limits
+        """
+        for recurrence in (self.start, self.end):
+            if len(recurrence.split()) != 5:
+                raise ValueError(f"Invalid cron expression for capacity window: {recurrence}")
+        if self.minimum < 0:
+            raise ValueError("Capacity window minimum can't be negative")
+        if self.size < self.minimum:
+            raise ValueError("Capacity window size must be at least the window minimum")
+        if self.size > maximum:
+            raise ValueError(
+                f"Capacity window size {self.size} is larger than the node group maximum {maximum}"
+            )
+
+
+def validate_schedule(schedule: List[CapacityWindow], maximum: int):
+    """
+    Validate a list of capacity windows and assign names to the unnamed ones
+    """
+    names = set()
+    for idx, window in enumerate(schedule):
+        window.validate(maximum)
+        window.name = window.name or f"window-{idx}"
+        if window.name in names:
+            raise ValueError(f"Duplicate capacity window name: {window.name}")
+        names.add(window.name)
+
+
+def build_capacity_schedule(
+    name: str, node_group: ManagedNodeGroup, schedule: List[CapacityWindow], minimum: int
+):
+    """
+    Create the scheduled actions for a node group on its autoscaling group
+
+    The maximum is never touched so the autoscaler keeps ownership of the upper bound.
+    """
+    group_name = autoscaling_group_name(node_group)
+    for window in schedule:
+        Schedule(
+            scheduled_action_name=f"{name}-{window.name}-open",
+            autoscaling_group_name=group_name,
+            recurrence=window.start,
+            time_zone=window.time_zone,
+            min_size=window.minimum,
+            desired_capacity=window.size,
+            max_size=-1,
+            **juno_resource(
+                f"{name}-{window.name}-open", opts=dict(parent=node_group), no_tags=True
+            ),
+        )
+
+        Schedule(
+            scheduled_action_name=f"{name}-{window.name}-close",
+            autoscaling_group_name=group_name,
+            recurrence=window.end,
+            time_zone=window.time_zone,
+            min_size=minimum,
+            desired_capacity=-1,
+            max_size=-1,
+            **juno_resource(
+                f"{name}-{window.name}-close", opts=dict(parent=node_group), no_tags=True
+            ),
+        )
+
+
+# EKS limit on nodes updated at once
+MAX_UNAVAILABLE = 100
+
+
+class NodeGroupUpdate:
+    """
+    Update policy of a node group
+
+    IN_PLACE rolls the nodes of the group, max_unavailable nodes or max_unavailable_percentage
+    of them at once. BLUE_GREEN names the EKS node group after a hash of its configuration so
+    a change of instances, AMI type, disk, labels or taints creates a complete replacement
+    group before the old one is drained and deleted. force replaces nodes whose pods can't be
+    drained because of a pod disruption budget instead of failing the update.
+    """
+
+    class Strategy(Enum):
+        IN_PLACE = "in-place"
+        BLUE_GREEN = "blue-green"
+
+    def __init__(
+        self,
+        strategy: Strategy = Strategy.IN_PLACE,
+        max_unavailable: int = None,
+        max_unavailable_percentage: int = None,
+        force: bool = False,
+    ):
+        self.strategy = strategy
+        self.max_unavailable = max_unavailable
+        self.max_unavailable_percentage = max_unavailable_percentage
+        self.force = force
+
+    def __str__(self):
+        unavailable = (
+            f"{self.max_unavailable_percentage}%"
+            if self.max_unavailable_percentage
+            else self.max_unavailable or 1
+        )
+        return f"{self.strategy.value}, {unavailable} unavailable{', forced' if self.force else ''}"
+
+    def validate(self):
+        """
+        Validate the policy against the EKS limits
+        """
+        if self.max_unavailable is not None and self.max_unavailable_percentage is not None:
+            raise ValueError("Set either max_unavailable or max_unavailable_percentage")
+        if self.max_unavailable is not None and not 0 < self.max_unavailable <= MAX_UNAVAILABLE:
+            raise ValueError(f"max_unavailable must be between 1 and {MAX_UNAVAILABLE}")
+        if (
+            self.max_unavailable_percentage is not None
+            and not 0 < self.max_unavailable_percentage <= 100  # noqa: PLR2004
+        ):
+            raise ValueError("max_unavailable_percentage must be between 1 and 100")
+
+    def group_name(self, name: str, args: Dict) -> Union[str, None]:
+        """
+        EKS node group name, hashed from the rollout relevant configuration for blue/green
+        """
+        if self.strategy != NodeGroupUpdate.Strategy.BLUE_GREEN:
+            return None
+        config = {
+            key: args.get(key)
+            for key in ("instance_types", "ami_type", "disk_size", "capacity_type", "labels")
+        }
+        config["taints"] = [taint.key for taint in args.get("taints") or []]
+        # only set on placement groups so the names of the other groups don't change
+        if args.get("placement"):
+            config["placement"] = args["placement"]
+        digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:6]
+        return f"{name}-{digest}"
+
+    def transform(self, args: ResourceTransformArgs) -> Union[ResourceTransformResult, None]:
+        """
+        Set the update config on the EKS node group of the managed node group component
+        """
+        if args.type_ != "aws:eks/nodeGroup:NodeGroup":
+            return None
+        if self.max_unavailable_percentage:
+            config = {"maxUnavailablePercentage": self.max_unavailable_percentage}
+        else:
+            config = {"maxUnavailable": self.max_unavailable}
+        return ResourceTransformResult({**args.props, "updateConfig": config}, args.opts)
+
+    @property
+    def transforms(self) -> List:
+        """
+        Transforms of the managed node group, EKS rolls one node at a time without them
+        """
+        if self.max_unavailable or self.max_unavailable_percentage:
+            return [self.transform]
+        return []
+
+
+# how GPU drivers reach the nodes for each EKS AMI type, EKS has no ARM GPU AMI type
+GPU_DRIVERS = {
+    "AL2_x86_64_GPU": "ami",
+    "AL2023_x86_64_NVIDIA": "ami",
+    "BOTTLEROCKET_x86_64_NVIDIA": "ami",
+    "AL2_x86_64": "operator",
+    "AL2023_x86_64_STANDARD": "operator",
+}
+
+
+def node_ami_type(architecture: str, gpu: bool, ami_type: str = None) -> str:
+    """
+    Return the EKS AMI type of a node group, the AL2 AMI of its architecture by default
+    """
+    arm = architecture == "arm64"
+    if gpu and arm:
+        raise ValueError("ARM GPU node groups aren't supported")
+    if ami_type is None:
+        if gpu:
+            return "AL2_x86_64_GPU"
+        return "AL2_ARM_64" if arm else "AL2_x86_64"
+    # a CUSTOM AMI needs an image id in a launch template, node groups don't take one
+    if ami_type == "CUSTOM":
+        raise ValueError("CUSTOM AMI types aren't supported on node groups")
+    if ("ARM" in ami_type) != arm:
+        raise ValueError(f"AMI type {ami_type} doesn't match the {architecture} instance types")
+    return ami_type
+
+
+def gpu_driver(ami_type: str) -> str:
+    """
+    Return the GPU driver strategy for a GPU node group AMI type
+    """
+    if ami_type not in GPU_DRIVERS:
+        raise ValueError(f"AMI type {ami_type} can't be used for GPU node groups")
+    return GPU_DRIVERS[ami_type]
+
+
+def cluster_gpu_driver(drivers: List[str]) -> str:
+    """
+    Pick the GPU operator driver strategy for the cluster from the node group strategies
+
+    Nodes with drivers in the AMI are labelled so the operator skips them either way.
+    """
+    return "operator" if "operator" in drivers else "ami"
+
+
+# GPU models that can be partitioned with MIG
+MIG_GPU_MODELS = ["a100", "a30", "h100", "h200"]
+
+
+class GpuSharing:
+    """
+    GPU sharing profile for a node group
+
+    TIME_SLICING advertises every GPU replicas times, MIG partitions the GPUs with mig_profile
+    (e.g. all-1g.10gb) and exposes them with mig_strategy, EXCLUSIVE gives each pod a whole GPU.
+    """
+
+    class Mode(Enum):
+        TIME_SLICING = "time-slicing"
+        MIG = "mig"
+        EXCLUSIVE = "exclusive"
+
+    def __init__(
+        self,
+        mode: Mode,
+        replicas: int = 1,
+        mig_profile: str = None,
+        mig_strategy: str = "single",
+    ):
+        self.mode = mode
+        self.replicas = replicas
+        self.mig_profile = mig_profile
+        self.mig_strategy = mig_strategy
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the device plugin config, identical profiles share it across node groups
+        """
+        if self.mode == GpuSharing.Mode.TIME_SLICING:
+            return f"time-slicing-{self.replicas}"
+        if self.mode == GpuSharing.Mode.MIG:
+            return f"mig-{self.mig_strategy}"
+        return "exclusive"
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        """
+        Node labels selecting the profile on the device plugin and MIG manager
+        """
+        labels = {"nvidia.com/device-plugin.config": self.name}
+        if self.mode == GpuSharing.Mode.MIG:
+            labels["nvidia.com/mig.config"] = self.mig_profile
+        return labels
+
+    def validate(self, instances: List[str]):
+        """
+        Validate the profile against the instance types of the node group
+        """
+        if self.mode == GpuSharing.Mode.TIME_SLICING and self.replicas < 2:
+            raise ValueError("Time slicing needs at least 2 replicas per GPU")
+        if self.mode != GpuSharing.Mode.MIG:
+            return
+        if not self.mig_profile:
+            raise ValueError("MIG sharing needs a mig_profile")
+        if self.mig_strategy not in {"single", "mixed"}:
+            raise ValueError(f"Invalid MIG strategy: {self.mig_strategy}")
+        for instance in instances:
+            spec = get_catalog().get(instance)
+            if spec and spec["gpu_model"] not in MIG_GPU_MODELS:
+                raise ValueError(f"Instance type {instance} doesn't support MIG")
+
+    def config(self) -> Dict:
+        """
+        Device plugin config for the profile
+        """
+        config = {
+            "version": "v1",
+            "flags": {
+                "migStrategy": self.mig_strategy if self.mode == GpuSharing.Mode.MIG else "none"
+            },
+        }
+        if self.mode == GpuSharing.Mode.TIME_SLICING:
+            config["sharing"] = {
+                "timeSlicing": {
+                    "renameByDefault": False,
+                    "failRequestsGreaterThanOne": False,
+                    "resources": [{"name": "nvidia.com/gpu", "replicas": self.replicas}],
+                }
+            }
+        return config
+
+
+def validate_efa(instances: List[str]):
+    """
+    Validate that every instance type of an EFA node group has an Elastic Fabric Adapter
+    """
+    missing = [instance for instance in instances if not get_catalog().get(instance, {}).get("efa")]
+    if missing:
+        raise ValueError(f"Instance types without EFA support: {', '.join(missing)}")
+
+
+def build_placement_template(
+    name: str, cluster: EksCluster, disk_size: int, efa_security_group: Output = None
+) -> NodeGroupLaunchTemplateArgs:
+    """
+    Create a cluster placement group and the launch template starting the nodes of a node
+    group in it
+
+    Managed node groups don't take a disk size next to a launch template, the root volume is
+    part of the template. With efa_security_group the primary interface is an EFA interface
+    in the cluster and EFA security groups.
+    """
+    placement_group = PlacementGroup(
+        strategy="cluster",
+        **juno_resource(f"{name}-placement", opts=dict(parent=cluster)),
+    )
+
+    network_interfaces = None
+    if efa_security_group is not None:
+        network_interfaces = [
+            {
+                "device_index": 0,
+                "interface_type": "efa",
+                "delete_on_termination": "true",
+                "security_groups": [
+                    cluster.eks_cluster.vpc_config.cluster_security_group_id,
+                    efa_security_group,
+                ],
+            }
+        ]
+
+    template = LaunchTemplate(
+        placement={"group_name": placement_group.name},
+        network_interfaces=network_interfaces,
+        block_device_mappings=[
+            {
+                "device_name": "/dev/xvda",
+                "ebs": {
+                    "volume_size": disk_size,
+                    "volume_type": "gp3",
+                    "delete_on_termination": "true",
+                },
+            }
+        ],
+        update_default_version=True,
+        **juno_resource(f"{name}-launch-template", opts=dict(parent=placement_group)),
+    )
+    return NodeGroupLaunchTemplateArgs(id=template.id, version=template.latest_version.apply(str))
@@ -1,5 +1,9 @@
+# std
+import hashlib
+from typing import Dict, List
+
 # 3rd
-from pulumi import ResourceOptions
+from pulumi import ResourceOptions, Alias
 from pulumi_aws.iam import (
     Role,
     RoleArgs,
@@ -11,10 +15,46 @@ from pulumi_aws.iam import (
 from pulumi_aws.ec2 import Subnet
 
 # local
-from .provider import context_prefix
+from .provider import context_prefix, get_account, juno_account_resource
 from . import policies
 
 
+# custom node policies by the short name their per cluster policy had
+NODE_POLICIES = {
+    "autoscale": "autoscale",
+    "ebs": "eks-ebs",
+    "efs": "eks-efs",
+    "ecr": "ecr",
+    "alb": "eks-ingress",
+}
+
+# node policy bundles shared by the clusters of an account, by account and content hash
+BUNDLES: Dict[str, Policy] = {}
+
+
+def node_policy_bundles() -> List[Policy]:
+    """
+    Account level policies packing the node policies that don't name the cluster
+    """
+    account = get_account().account
+    shared = [
+        policy
+        for policy in NODE_POLICIES.values()
+        if policies.CLUSTER_PLACEHOLDER not in policies.get_policy(policy)
+    ]
+
+    bundles = []
+    for document in policies.pack_policies(shared):
+        digest = hashlib.sha256(document.encode()).hexdigest()[:8]
+        key = f"{account}-{digest}"
+        if key not in BUNDLES:
+            BUNDLES[key] = Policy(
+                policy=document, **juno_account_resource(f"node-policy-{digest}", no_tags=True)
+            )
+        bundles.append(BUNDLES[key])
+    return bundles
+
+
 def build_node_role(cluster: str, parent: Subnet) -> Role:
     """
     Build the node role for the EKS cluster
@@ -25,35 +65,18 @@ def build_node_role(cluster: str, parent: Subnet) -> Role:
         opts=ResourceOptions(parent=parent),
     )
 
-    ebs_policy = Policy(
-        f"{context_prefix()}-base-node-ebs-policy",
-        PolicyArgs(policy=policies.get_policy("eks-ebs")),
-        opts=ResourceOptions(parent=base_node_role),
-    )
-
-    alb_policy = Policy(
-        f"{context_prefix()}-base-node-alb-policy",
-        PolicyArgs(policy=policies.get_policy("eks-ingress")),
-        opts=ResourceOptions(parent=base_node_role),
-    )
-
-    efs_policy = Policy(
-        f"{context_prefix()}-base-node-efs-policy",
-        PolicyArgs(policy=policies.get_policy("eks-efs")),
-        opts=ResourceOptions(parent=base_node_role),
-    )
-
-    ecr_policy = Policy(
-        f"{context_prefix()}-base-node-ecr-policy",
-        PolicyArgs(policy=policies.get_policy("ecr")),
-        opts=ResourceOptions(parent=base_node_role),
-    )
-
-    autoscale_policy = Policy(
-        f"{context_prefix()}-base-node-autoscale-policy",
-        PolicyArgs(policy=policies.get_policy("autoscale").replace("JUNO-CLUSTER", cluster)),
-        opts=ResourceOptions(parent=base_node_role),
-    )
+    # only the policies naming the cluster are created per cluster
+    cluster_policies = [
+        Policy(
+            f"{context_prefix()}-base-node-{name}-policy",
+            PolicyArgs(
+                policy=policies.get_policy(policy).replace(policies.CLUSTER_PLACEHOLDER, cluster)
+            ),
+            opts=ResourceOptions(parent=base_node_role),
+        )
+        for name, policy in NODE_POLICIES.items()
+        if policies.CLUSTER_PLACEHOLDER in policies.get_policy(policy)
+    ]
 
     # attached policies
     node_policies = [
@@ -61,17 +84,24 @@ def build_node_role(cluster: str, parent: Subnet) -> Role:
         policies.EKS_CNI,
         policies.EKS_WORKER,
         policies.EFS_CSI,
-        autoscale_policy.arn,
-        ebs_policy.arn,
-        efs_policy.arn,
-        ecr_policy.arn,
-        alb_policy.arn,
+        *[policy.arn for policy in cluster_policies],
+        *[policy.arn for policy in node_policy_bundles()],
     ]
+    if len(node_policies) > policies.ROLE_POLICY_LIMIT:
+        raise ValueError(
+            f"{len(node_policies)} node policies exceed the limit of "
+            f"{policies.ROLE_POLICY_LIMIT} managed policies per role"
+        )
 
+    # the attachments used to be children of the per cluster ecr policy
+    ecr_policy = f"{context_prefix()}-base-node-ecr-policy"
+    previous_parent = base_node_role.urn.apply(
+        lambda urn: f"{urn.rsplit('::', 1)[0]}$aws:iam/policy:Policy::{ecr_policy}"
+    )
     for idx, policy in enumerate(node_policies):
         RolePolicyAttachment(
             f"{context_prefix()}-base-node-policy-attachment-{idx}",
             RolePolicyAttachmentArgs(policy_arn=policy, role=base_node_role),
-            opts=ResourceOptions(parent=ecr_policy),
+            opts=ResourceOptions(parent=base_node_role, aliases=[Alias(parent=previous_parent)]),
         )
     return base_node_role
@@ -0,0 +1,316 @@
+"""
+Offline plan mode
+
+Evaluates the pulumi program under pulumi mocks with fixture data for the invokes, so a fleet
+change can be validated without AWS credentials or network access. Prints the resource
+inventory of every context: resource counts, node groups and CIDRs.
+
+    python -m src.plan [__main__.py] [--fixtures plan.json] [--names] [--json]
+
+Fixtures are optional, a json file with any of:
+
+    {
+        "accounts": {"deploy": "123456789012"},
+        "zones": {"us-east-1": ["us-east-1a", "us-east-1b"]},
+        "service_cidr": "10.100.0.0/16",
+        "version": "1.31"
+    }
+
+Accounts default to the names passed to JunoAccount and set_root_account in the program with
+made up ids, zones default to a, b and c of the region.
+"""
+
+# std
+import os
+import re
+import sys
+import ast
+import json
+import time
+import runpy
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, List
+
+# 3rd
+import pulumi
+from pulumi.runtime import rpc, settings
+from pulumi.runtime.mocks import MockMonitor
+from pulumi.runtime.stack import wait_for_rpcs
+from pulumi.runtime.settings import monitor_supports_feature
+from pulumi.runtime.proto import callback_pb2
+import requests
+
+# local
+from . import chart_cache
+from .provider import prefix_for
+
+
+REGION = re.compile(r"[a-z]{2}(?:-gov)?-[a-z]+-\d")
+PROVIDER = re.compile(r"^(.+)-([a-z]{2}(?:-gov)?-[a-z]+-\d)-provider$")
+
+
+def _account_id(name: str) -> str:
+    return str(int(hashlib.sha256(name.encode()).hexdigest()[:12], 16))[:12].rjust(12, "1")
+
+
+def program_accounts(path: str) -> Dict[str, str]:
+    """
+    Accounts named in the program with made up ids
+    """
+    with open(path) as handle:
+        tree = ast.parse(handle.read())
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        func = node.func
+        called = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", "")
+        argument = node.args[0]
+        if called in {"JunoAccount", "set_root_account"} and isinstance(argument, ast.Constant):
+            names.add(argument.value)
+    return {name: _account_id(name) for name in sorted(names)}
+
+
+class OfflineResponse:
+    """
+    Empty response for the manifests ConfigFile fetches
+    """
+
+    text = ""
+
+    def raise_for_status(self):
+        pass
+
+
+class PlanCallbacks:
+    """
+    Accepts the transforms of the program, they apply inside the components the mocks stand in for
+    """
+
+    @staticmethod
+    def register_transform(transform) -> callback_pb2.Callback:
+        return callback_pb2.Callback(target="plan", token=str(id(transform)))
+
+
+class PlanMocks(pulumi.runtime.Mocks):
+    """
+    Mocks answering the invokes from fixtures and recording the resources
+    """
+
+    def __init__(self, fixtures: Dict, monitor: MockMonitor = None):
+        self.fixtures = fixtures
+        self.monitor = monitor
+        self.resources: List[Dict] = []
+        self.invokes: Dict[str, int] = {}
+
+    def _reference(self, type_: str, name: str, state: Dict) -> Dict:
+        """
+        Register a child resource of a remote component and return a reference to it
+        """
+        urn = f"urn:pulumi:{pulumi.get_stack()}::{pulumi.get_project()}::{type_}::{name}"
+        self.monitor.resources[urn] = MockMonitor.ResourceRegistration(urn, name, state)
+        return {rpc._special_sig_key: rpc._special_resource_sig, "urn": urn, "id": name}
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        self.resources.append({"type": args.typ, "name": args.name, "inputs": args.inputs})
+        # the provider hands policy documents back as json strings
+        state = {
+            key: json.dumps(value) if isinstance(value, dict) and "Statement" in value else value
+            for key, value in args.inputs.items()
+        }
+        state.setdefault("arn", f"arn:aws:plan::{args.name}")
+        state.setdefault("name", args.name)
+
+        if args.typ == "eks:index:Cluster":
+            state["eksCluster"] = self._reference(
+                "aws:eks/cluster:Cluster",
+                f"{args.name}-eksCluster",
+                {
+                    "name": args.name,
+                    "arn": f"arn:aws:eks:plan::cluster/{args.name}",
+                    "endpoint": f"https://{args.name}.eks.amazonaws.com",
+                    "certificateAuthority": {"data": ""},
+                    "identities": [
+                        {"oidcs": [{"issuer": f"https://oidc.eks.amazonaws.com/id/{args.name}"}]}
+                    ],
+                    "vpcConfig": {"clusterSecurityGroupId": f"{args.name}-sg"},
+                    "version": args.inputs.get("version") or self.fixtures.get("version", "1.31"),
+                    "kubernetesNetworkConfig": {
+                        "serviceIpv4Cidr": self.fixtures.get("service_cidr", "10.100.0.0/16")
+                    },
+                },
+            )
+
+        elif args.typ == "eks:index:ManagedNodeGroup":
+            state["nodeGroup"] = self._reference(
+                "aws:eks/nodeGroup:NodeGroup",
+                f"{args.name}-nodeGroup",
+                {"resources": [{"autoscalingGroups": [{"name": f"eks-{args.name}"}]}]},
+            )
+
+        return [f"{args.name}-id", state]
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        self.invokes[args.token] = self.invokes.get(args.token, 0) + 1
+        if args.token == "aws:organizations/getOrganization:getOrganization":
+            return {
+                "id": "o-plan",
+                "accounts": [
+                    {"name": name, "id": account_id, "arn": "", "email": "", "status": "ACTIVE"}
+                    for name, account_id in self.fixtures["accounts"].items()
+                ],
+            }
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            match = REGION.search(args.provider or "")
+            region = match.group(0) if match else "us-east-1"
+            zones = self.fixtures.get("zones", {}).get(region) or [
+                f"{region}{zone}" for zone in "abc"
+            ]
+            return {"id": region, "names": zones, "zoneIds": zones}
+        if args.token == "aws:index/getPartition:getPartition":
+            return {"id": "aws", "partition": "aws", "dnsSuffix": "amazonaws.com"}
+        if args.token == "aws:eks/getAddonVersion:getAddonVersion":
+            version = args.args.get("kubernetesVersion")
+            return {"id": args.args.get("addonName"), "version": f"v{version}-plan"}
+        if args.token == "kubernetes:helm:template":
+            return {"result": []}
+        if args.token == "kubernetes:yaml:decode":
+            return {"result": []}
+        return {}
+
+
+def inventory(resources: List[Dict]) -> Dict[str, Dict]:
+    """
+    Resources grouped by the context their name prefix belongs to
+    """
+    contexts = {}
+    accounts = set()
+    for resource in resources:
+        match = PROVIDER.match(resource["name"])
+        if resource["type"] == "pulumi:providers:aws" and match:
+            account, region = match.groups()
+            accounts.add(account)
+            for cluster in (None, "public", "private"):
+                label = "/".join(part for part in (account, region, cluster) if part)
+                contexts[prefix_for(account, region, cluster)] = label
+
+    report = {}
+    for resource in resources:
+        prefix = resource["name"].split("-", 1)[0]
+        label = contexts.get(prefix) or next(
+            (account for account in accounts if resource["name"].startswith(f"{account}-")),
+            "other",
+        )
+        entry = report.setdefault(
+            label, {"count": 0, "types": {}, "names": [], "node_groups": [], "cidrs": []}
+        )
+        entry["count"] += 1
+        entry["types"][resource["type"]] = entry["types"].get(resource["type"], 0) + 1
+        entry["names"].append(resource["name"])
+
+        inputs = resource["inputs"]
+        if resource["type"] == "eks:index:ManagedNodeGroup":
+            scaling = inputs.get("scalingConfig") or {}
+            entry["node_groups"].append({
+                "name": resource["name"],
+                "capacity": inputs.get("capacityType"),
+                "instances": inputs.get("instanceTypes") or [],
+                # mocked inputs come through as floats
+                "min": int(scaling.get("minSize") or 0),
+                "size": int(scaling.get("desiredSize") or 0),
+                "max": int(scaling.get("maxSize") or 0),
+            })
+        elif resource["type"] in {
+            "aws:ec2/vpc:Vpc",
+            "aws:ec2/subnet:Subnet",
+            "aws:ec2/vpcIpv4CidrBlockAssociation:VpcIpv4CidrBlockAssociation",
+        }:
+            zone = inputs.get("availabilityZone")
+            entry["cidrs"].append(
+                f"{inputs.get('cidrBlock')} {resource['name']}{f' ({zone})' if zone else ''}"
+            )
+    return dict(sorted(report.items()))
+
+
+def plan(path: str, fixtures: Dict) -> PlanMocks:
+    """
+    Evaluate the program under mocks, the mocks hold the registered resources and invokes
+    """
+    fixtures.setdefault("accounts", program_accounts(path))
+
+    # plan renders are empty, keep them out of the real chart cache
+    chart_cache.CACHE_DIR = tempfile.mkdtemp(prefix="juno-plan-")
+    # the ConfigFile manifests are URLs, nothing is fetched offline
+    requests.get = lambda url, **kwargs: OfflineResponse()
+    os.environ.setdefault("GIT_USER", "plan")
+    os.environ.setdefault("GIT_PASS", "plan")
+
+    mocks = PlanMocks(fixtures)
+    mocks.monitor = MockMonitor(mocks)
+    pulumi.runtime.set_mocks(
+        mocks, project="juno", stack="plan", preview=True, monitor=mocks.monitor
+    )
+
+    # the engine primes its feature support and serves the callbacks, the mocks don't
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(monitor_supports_feature("transforms"))
+    settings.SETTINGS.callbacks = PlanCallbacks()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    runpy.run_path(path, run_name="__main__")
+    loop.run_until_complete(wait_for_rpcs())
+    return mocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline plan of the pulumi program")
+    parser.add_argument("program", nargs="?", default="__main__.py")
+    parser.add_argument("--fixtures", help="json fixtures for the invokes")
+    parser.add_argument("--names", action="store_true", help="list every resource name")
+    parser.add_argument("--json", action="store_true", help="print the inventory as json")
+    args = parser.parse_args()
+
+    fixtures = {}
+    if args.fixtures:
+        with open(args.fixtures) as handle:
+            fixtures = json.load(handle)
+
+    # the program reports its clusters on stdout, keep the json clean
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        resources = plan(args.program, fixtures).resources
+    took = time.perf_counter() - started
+    report = inventory(resources)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for label, entry in report.items():
+        print(f"{label}: {entry['count']} resources")
+        for kind, count in sorted(entry["types"].items(), key=lambda item: -item[1]):
+            print(f"\t{count:>4} {kind}")
+        if entry["cidrs"]:
+            print("\tCIDRs:")
+            for cidr in entry["cidrs"]:
+                print(f"\t\t{cidr}")
+        if entry["node_groups"]:
+            print("\tNode Groups:")
+            for group in entry["node_groups"]:
+                print(
+                    f"\t\t{group['name']}: {group['capacity']} {group['min']}/{group['size']}/"
+                    f"{group['max']} {', '.join(group['instances'])}"
+                )
+        if args.names:
+            print("\tResources:")
+            for name in entry["names"]:
+                print(f"\t\t{name}")
+    print(f"Planned {len(resources)} resources in {took:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
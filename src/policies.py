@@ -1,6 +1,7 @@
 # std
 import json
 import os
+from typing import List
 
 
 EKS_WORKER = "arn:aws:iam::aws:policy/AmazonEKSWorkerNodePolicy"
@@ -8,6 +9,13 @@ EKS_CNI = "arn:aws:iam::aws:policy/AmazonEKS_CNI_Policy"
 ECR_RO = "arn:aws:iam::aws:policy/AmazonEC2ContainerRegistryReadOnly"
 EFS_CSI = "arn:aws:iam::aws:policy/service-role/AmazonEFSCSIDriverPolicy"
 
+# managed policy document limit, whitespace excluded
+POLICY_SIZE = 6144
+# managed policies attached to a role
+ROLE_POLICY_LIMIT = 10
+# documents naming the cluster can't be shared between clusters
+CLUSTER_PLACEHOLDER = "JUNO-CLUSTER"
+
 
 def get_policy(name: str) -> str:
     """
@@ -25,3 +33,33 @@ def get_role(name: str) -> str:
     role = os.path.abspath(f"{__file__}/../custom_roles/{name}.json")
     with open(role, "r", encoding="utf-8") as role_file:
         return json.loads(role_file.read())
+
+
+def _compact(document) -> str:
+    return json.dumps(document, separators=(",", ":"), sort_keys=True)
+
+
+def pack_policies(names: List[str]) -> List[str]:
+    """
+    Pack the statements of policies into as few documents as the size limit allows
+    """
+    statements = [
+        statement for name in names for statement in json.loads(get_policy(name))["Statement"]
+    ]
+    # first fit decreasing, ties broken by content so the packing is stable
+    statements.sort(key=lambda statement: (-len(_compact(statement)), _compact(statement)))
+
+    documents: List[List[dict]] = []
+    for statement in statements:
+        for document in documents:
+            if len(_compact({"Version": "2012-10-17", "Statement": [*document, statement]})) <= (
+                POLICY_SIZE
+            ):
+                document.append(statement)
+                break
+        else:
+            if len(_compact({"Version": "2012-10-17", "Statement": [statement]})) > POLICY_SIZE:
+                raise ValueError(f"Policy statement exceeds {POLICY_SIZE} characters")
+            documents.append([statement])
+
+    return [_compact({"Version": "2012-10-17", "Statement": document}) for document in documents]
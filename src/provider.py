@@ -30,19 +30,34 @@ def set_cluster(cluster: Union[str, None]):
     CLUSTER = cluster
 
 
-def context_prefix() -> str:
+def get_cluster() -> Union[str, None]:
     """
-    Return the current context prefix
+    Return the current cluster
+    """
+    global CLUSTER
+    return CLUSTER
+
+
+def prefix_for(account: str, region: str, cluster: Union[str, None] = None) -> str:
+    """
+    Return the prefix of an account, region and optional cluster
     """
-    prefix = f"{CONTEXT.account}-{CONTEXT.region}"
-    if CLUSTER:
-        prefix = f"{prefix}-{CLUSTER}"
+    prefix = f"{account}-{region}"
+    if cluster:
+        prefix = f"{prefix}-{cluster}"
     hasher = hashlib.sha3_512()
     hasher.update(prefix.encode())
     prefix = hasher.hexdigest()[0::5][:6]
     return prefix.lower()
 
 
+def context_prefix() -> str:
+    """
+    Return the current context prefix
+    """
+    return prefix_for(CONTEXT.account, CONTEXT.region, CLUSTER)
+
+
 def context_export(name, target):
     """
     Return the current context prefix
@@ -23,3 +23,9 @@ class SecuritySpec:
         cidr_blocks=["0.0.0.0/0"],
         ipv6_cidr_blocks=["::/0"],
     )
+    SELF = SecurityGroupIngressArgs(
+        from_port=0,
+        to_port=0,
+        protocol="-1",
+        self=True,
+    )
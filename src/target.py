@@ -0,0 +1,148 @@
+"""
+Targeted pulumi runs by Juno context
+
+Resolves account/region[/cluster] selectors to the URNs of the stack through the same prefix
+function the resources are named with and runs a targeted preview, up or refresh on them.
+The cluster is public or private, a region selector covers the region and both clusters.
+Children of the matched resources are included through the parent tree. Preview and up also
+target the prefixes by URN glob, so resources of the context that aren't in the state yet,
+like a new node group, are created too.
+
+    python -m src.target refresh deploy/us-east-1/public
+    python -m src.target up deploy/us-east-1 deploy/us-west-2/private -- --yes
+    python -m src.target list deploy/us-east-1/private
+"""
+
+# std
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Set
+
+# local
+from .provider import prefix_for
+
+
+CLUSTERS = ("public", "private")
+COMMANDS = ("preview", "up", "refresh", "list")
+# commands that can create resources the state doesn't know yet
+CREATING = ("preview", "up")
+
+
+def project_name(path: str = "Pulumi.yaml") -> str:
+    """
+    Name of the pulumi project
+    """
+    if os.path.exists(path):
+        with open(path) as handle:
+            for line in handle:
+                if line.startswith("name:"):
+                    return line.split(":", 1)[1].strip()
+    raise ValueError(f"No project name in {path}")
+
+
+def prefix_targets(stack: str, project: str, prefixes: Set[str]) -> List[str]:
+    """
+    URN globs matching every resource named with one of the prefixes, in the state or not
+    """
+    stack = stack.rsplit("/", 1)[-1]
+    return [f"urn:pulumi:{stack}::{project}::**::{prefix}-*" for prefix in sorted(prefixes)]
+
+
+def selector_prefixes(selector: str) -> Set[str]:
+    """
+    Prefixes matched by an account/region[/cluster] selector
+    """
+    parts = selector.strip("/").split("/")
+    if len(parts) == 2:
+        account, region = parts
+        return {prefix_for(account, region)} | {
+            prefix_for(account, region, cluster) for cluster in CLUSTERS
+        }
+    if len(parts) == 3 and parts[2] in CLUSTERS:
+        return {prefix_for(*parts)}
+    raise ValueError(f"Invalid selector {selector}, expected account/region[/public|private]")
+
+
+def stack_resources(stack: str) -> List[Dict]:
+    """
+    Resources of the stack state
+    """
+    result = subprocess.run(
+        ["pulumi", "stack", "export", "--stack", stack],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode:
+        raise ValueError(f"pulumi stack export failed: {result.stderr.strip()}")
+    return json.loads(result.stdout)["deployment"].get("resources") or []
+
+
+def resolve(resources: List[Dict], prefixes: Set[str]) -> List[str]:
+    """
+    URNs named with one of the prefixes and all their descendants, in state order
+    """
+    children: Dict[str, List[str]] = {}
+    for resource in resources:
+        if resource.get("parent"):
+            children.setdefault(resource["parent"], []).append(resource["urn"])
+
+    pending = [
+        resource["urn"]
+        for resource in resources
+        if resource["urn"].rsplit("::", 1)[-1].split("-", 1)[0] in prefixes
+    ]
+    selected = set()
+    while pending:
+        urn = pending.pop()
+        if urn not in selected:
+            selected.add(urn)
+            pending += children.get(urn, [])
+
+    return [resource["urn"] for resource in resources if resource["urn"] in selected]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Targeted pulumi runs by Juno context")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("selectors", nargs="+", help="account/region[/public|private]")
+    parser.add_argument("--stack", default="juno")
+    # everything after -- goes to pulumi
+    argv = sys.argv[1:]
+    split = argv.index("--") if "--" in argv else len(argv)
+    args = parser.parse_args(argv[:split])
+    extra = argv[split + 1 :]
+
+    try:
+        prefixes = set()
+        for selector in args.selectors:
+            prefixes |= selector_prefixes(selector)
+        urns = resolve(stack_resources(args.stack), prefixes)
+        globs = []
+        if args.command in CREATING:
+            globs = prefix_targets(args.stack, project_name(), prefixes)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+
+    if not urns and not globs:
+        print(f"No resources in {args.stack} match {' '.join(args.selectors)}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "list":
+        print("\n".join(urns))
+        return
+
+    print(f"Targeting {len(urns)} resources of {args.stack}")
+    if globs:
+        print(f"Targeting new resources of {len(prefixes)} prefixes")
+    targets = [option for urn in [*urns, *globs] for option in ("--target", urn)]
+    command = ["pulumi", args.command, "--stack", args.stack, *targets, *extra]
+    sys.exit(subprocess.run(command, check=False).returncode)
+
+
+if __name__ == "__main__":
+    main()
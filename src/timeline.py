@@ -0,0 +1,300 @@
+"""
+Deployment timeline recorder
+
+Records how long every resource step of a pulumi up took from the engine event log into a
+local SQLite store and reports the slowest resources, the time each cluster took to come up
+and how resource types trend across runs.
+
+    pulumi up --stack juno --event-log events.json
+    python -m src.timeline record events.json --stack juno
+    python -m src.timeline report
+
+Resource names start with their context_prefix(). Every Cluster exports the account, region
+and cluster behind its prefix as <prefix>-context, the recorder picks those up from the stack
+outputs in the event log to label the steps.
+"""
+
+# std
+import os
+import re
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, List, Union
+
+
+DATABASE = os.environ.get("JUNO_TIMELINE", "timeline.db")
+STACK_TYPE = "pulumi:pulumi:Stack"
+PREFIX = re.compile(r"^([0-9a-f]{6})-")
+CONTEXT_OUTPUT = re.compile(r"^([0-9a-f]{6})-context$")
+
+SCHEMA = """
+create table if not exists runs (
+    id integer primary key,
+    stack text,
+    started real,
+    finished real,
+    failed integer
+);
+create table if not exists steps (
+    run integer references runs (id),
+    urn text,
+    type text,
+    prefix text,
+    op text,
+    started real,
+    finished real,
+    failed integer
+);
+create table if not exists contexts (
+    prefix text primary key,
+    account text,
+    region text,
+    cluster text
+);
+"""
+
+
+def connect(path: str = DATABASE) -> sqlite3.Connection:
+    """
+    Open the timeline store
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _prefix(urn: str) -> Union[str, None]:
+    """
+    context_prefix() of a resource from its URN
+    """
+    match = PREFIX.match(urn.rsplit("::", 1)[-1])
+    return match.group(1) if match else None
+
+
+def _contexts(outputs: Dict) -> List[tuple]:
+    """
+    Prefix contexts exported by the clusters
+    """
+    contexts = []
+    for name, value in outputs.items():
+        match = CONTEXT_OUTPUT.match(name)
+        if match and isinstance(value, dict):
+            contexts.append((
+                match.group(1),
+                value.get("account"),
+                value.get("region"),
+                value.get("cluster"),
+            ))
+    return contexts
+
+
+def parse_events(lines) -> Dict:
+    """
+    Steps, contexts and the run span from engine event log lines
+    """
+    steps = {}
+    contexts = []
+    started = finished = None
+    failed = False
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            # the engine was killed mid write, the last line is cut off
+            continue
+        timestamp = event.get("timestamp")
+        if timestamp is not None:
+            started = timestamp if started is None else min(started, timestamp)
+            finished = timestamp if finished is None else max(finished, timestamp)
+
+        # the stack resource spans the whole run
+        if (
+            "resourcePreEvent" in event
+            and event["resourcePreEvent"]["metadata"]["type"] != STACK_TYPE
+        ):
+            metadata = event["resourcePreEvent"]["metadata"]
+            steps[metadata["urn"]] = {
+                "urn": metadata["urn"],
+                "type": metadata["type"],
+                "op": metadata["op"],
+                "started": timestamp,
+                "finished": None,
+                "failed": False,
+            }
+
+        elif "resOutputsEvent" in event:
+            metadata = event["resOutputsEvent"]["metadata"]
+            step = steps.get(metadata["urn"])
+            if step:
+                step["finished"] = timestamp
+            if metadata["type"] == STACK_TYPE:
+                contexts += _contexts((metadata.get("new") or {}).get("outputs") or {})
+
+        elif "resOpFailedEvent" in event:
+            metadata = event["resOpFailedEvent"]["metadata"]
+            step = steps.get(metadata["urn"])
+            if step:
+                step["finished"] = timestamp
+                step["failed"] = True
+            failed = True
+
+        elif "summaryEvent" in event:
+            failed = failed or bool(event["summaryEvent"].get("resourceChanges", {}).get("failed"))
+
+    return {
+        "steps": list(steps.values()),
+        "contexts": contexts,
+        "started": started,
+        "finished": finished,
+        "failed": failed,
+    }
+
+
+def record(path: str, stack: str, connection: sqlite3.Connection) -> Union[int, None]:
+    """
+    Record an event log as a run, returns the run id or None when there was nothing to record
+    """
+    # pulumi fails before writing the log when the program doesn't start
+    if not os.path.exists(path):
+        print(f"No event log at {path}, nothing recorded")
+        return None
+    with open(path) as handle:
+        run = parse_events(handle)
+    if run["started"] is None:
+        print(f"No events in {path}, nothing recorded")
+        return None
+
+    with connection:
+        cursor = connection.execute(
+            "insert into runs (stack, started, finished, failed) values (?, ?, ?, ?)",
+            (stack, run["started"], run["finished"], run["failed"]),
+        )
+        run_id = cursor.lastrowid
+        connection.executemany(
+            "insert into steps values (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    step["urn"],
+                    step["type"],
+                    _prefix(step["urn"]),
+                    step["op"],
+                    step["started"],
+                    step["finished"],
+                    step["failed"],
+                )
+                for step in run["steps"]
+            ],
+        )
+        connection.executemany(
+            "insert or replace into contexts values (?, ?, ?, ?)", run["contexts"]
+        )
+
+    changed = [step for step in run["steps"] if step["op"] != "same"]
+    print(f"Recorded run {run_id}: {len(changed)} changed of {len(run['steps'])} resources")
+    return run_id
+
+
+def _span(started: Union[float, None], finished: Union[float, None]) -> Union[float, None]:
+    if started is None or finished is None:
+        return None
+    return finished - started
+
+
+def _duration(seconds: Union[float, None]) -> str:
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def report(connection: sqlite3.Connection, runs: int = 10, top: int = 15):  # noqa: PLR0914
+    """
+    Print the slowest resources of the last run, per cluster time-to-ready and type trends
+    """
+    recent = connection.execute(
+        "select id, stack, started, finished, failed from runs order by id desc limit ?", (runs,)
+    ).fetchall()
+    if not recent:
+        print("No runs recorded")
+        return
+    last = recent[0]
+    status = "failed" if last[4] else "ok"
+    # runs recorded from empty event logs before they were skipped have no timestamps
+    when = "-" if last[2] is None else f"{datetime.fromtimestamp(last[2]):%Y-%m-%d %H:%M}"
+    print(f"Run {last[0]} ({last[1]}, {when}, {status}): {_duration(_span(last[2], last[3]))}")
+
+    print("\nSlowest resources")
+    slowest = connection.execute(
+        """
+        select s.finished - s.started as took, s.op, s.type, s.urn, s.failed
+        from steps s where s.run = ? and s.op != 'same' and s.finished is not null
+        order by took desc limit ?
+        """,
+        (last[0], top),
+    ).fetchall()
+    for took, op, kind, urn, failed in slowest:
+        name = urn.rsplit("::", 1)[-1]
+        print(f"\t{_duration(took):>8} {op:<8} {kind} {name}{' FAILED' if failed else ''}")
+
+    print("\nCluster time-to-ready")
+    clusters = connection.execute(
+        """
+        select coalesce(c.cluster, s.prefix), c.account, c.region,
+               max(s.finished) - min(s.started), count(*)
+        from steps s left join contexts c on c.prefix = s.prefix
+        where s.run = ? and s.op != 'same' and s.prefix is not null
+        group by s.prefix order by 4 desc
+        """,
+        (last[0],),
+    ).fetchall()
+    for cluster, account, region, took, count in clusters:
+        where = f" ({account} {region})" if account else ""
+        print(f"\t{_duration(took):>8} {cluster}{where}, {count} resources")
+
+    print(f"\nSlowest step per type over the last {len(recent)} runs, oldest first")
+    ids = [row[0] for row in reversed(recent)]
+    marks = ",".join("?" * len(ids))
+    rows = connection.execute(
+        f"""
+        select type, run, max(finished - started)
+        from steps where run in ({marks}) and op != 'same' and finished is not null
+        group by type, run
+        """,  # noqa: S608
+        ids,
+    ).fetchall()
+    trends: Dict[str, Dict[int, float]] = {}
+    for kind, run, took in rows:
+        trends.setdefault(kind, {})[run] = took
+    ranked = sorted(trends.items(), key=lambda item: -max(item[1].values()))[:top]
+    for kind, durations in ranked:
+        series = " ".join(f"{_duration(durations.get(run)):>7}" for run in ids)
+        print(f"\t{kind:<48} {series}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deployment timeline recorder")
+    parser.add_argument("--database", default=DATABASE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record a pulumi --event-log file")
+    recorder.add_argument("event_log")
+    recorder.add_argument("--stack", default="juno")
+    reporter = commands.add_parser("report", help="report the recorded runs")
+    reporter.add_argument("--runs", type=int, default=10)
+    reporter.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    connection = connect(args.database)
+    if args.command == "record":
+        record(args.event_log, args.stack, connection)
+    else:
+        report(connection, args.runs, args.top)
+
+
+if __name__ == "__main__":
+    main()
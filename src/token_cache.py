@@ -0,0 +1,213 @@
+"""
+Cached EKS tokens for the cluster kubeconfig
+
+The kubeconfig built here runs this file as its exec credential plugin instead of calling
+aws eks get-token directly. The assumed role credentials are cached per profile and role and
+shared by every cluster in the account, the tokens signed with them are cached per cluster.
+Both are reused until shortly before they expire, a token never outlives the credentials that
+signed it. The providers of a deployment only hit STS when the cache runs dry.
+
+Set JUNO_STS_ENDPOINT to point the STS calls at a local stub and JUNO_TOKEN_CACHE to move the
+cache directory. The file only uses the standard library so it can run without the project
+environment.
+"""
+
+# std
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Union
+
+
+CACHE_DIR = os.environ.get(
+    "JUNO_TOKEN_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "juno", "eks")
+)
+STS_ENDPOINT = os.environ.get("JUNO_STS_ENDPOINT")
+SESSION_NAME = "juno-eks"
+
+# refresh a minute early so a request in flight doesn't present an expired token
+EXPIRY_MARGIN = 60
+
+# the providers run from the project directory, an absolute path would tie the provider state
+# to one checkout
+PLUGIN = os.path.join("src", os.path.basename(__file__))
+
+
+def _cache_path(kind: str, *parts: Union[str, None]) -> str:
+    """
+    Cache file for a credential
+    """
+    key = hashlib.sha256("|".join(part or "" for part in parts).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{kind}-{key}.json")
+
+
+def _seconds_left(expiration: str) -> float:
+    """
+    Seconds until an ISO 8601 expiration
+    """
+    expires = datetime.fromisoformat(expiration.replace("Z", "+00:00"))
+    return (expires - datetime.now(timezone.utc)).total_seconds()
+
+
+def _load(path: str, expiration) -> Union[Dict, None]:
+    """
+    Load a cached credential if it is still valid
+    """
+    try:
+        with open(path) as handle:
+            cached = json.load(handle)
+        if _seconds_left(expiration(cached)) > EXPIRY_MARGIN:
+            return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _store(path: str, payload: Dict):
+    """
+    Atomically write a credential readable only by the current user
+    """
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    temp = f"{path}.{os.getpid()}"
+    with open(os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as handle:
+        json.dump(payload, handle)
+    os.replace(temp, path)
+
+
+def _aws(args: List[str], env: Dict[str, str]) -> Dict:
+    """
+    Run an aws cli command and return its json output
+    """
+    result = subprocess.run(
+        ["aws", *args, "--output", "json"], env=env, capture_output=True, text=True, check=False
+    )
+    if result.returncode:
+        raise ValueError(f"aws {' '.join(args[:2])} failed: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def role_credentials(role_arn: str, profile: Union[str, None]) -> Dict:
+    """
+    Assumed role credentials, shared by every cluster using the role
+    """
+    path = _cache_path("role", profile, role_arn)
+    cached = _load(path, lambda payload: payload["Expiration"])
+    if cached:
+        return cached
+
+    args = ["sts", "assume-role", "--role-arn", role_arn, "--role-session-name", SESSION_NAME]
+    if profile:
+        args += ["--profile", profile]
+    if STS_ENDPOINT:
+        args += ["--endpoint-url", STS_ENDPOINT]
+    credentials = _aws(args, dict(os.environ))["Credentials"]
+    _store(path, credentials)
+    return credentials
+
+
+def cluster_token(
+    cluster_name: str, region: str, role_arn: Union[str, None], profile: Union[str, None]
+) -> Dict:
+    """
+    ExecCredential for a cluster
+    """
+    path = _cache_path("token", profile, role_arn, region, cluster_name)
+    cached = _load(path, lambda payload: payload["status"]["expirationTimestamp"])
+    if cached:
+        return cached
+
+    env = dict(os.environ)
+    args = ["eks", "get-token", "--cluster-name", cluster_name, "--region", region]
+    credentials = None
+    if role_arn:
+        # the token is signed locally with the cached role, no STS call
+        credentials = role_credentials(role_arn, profile)
+        for key in ("AWS_PROFILE", "AWS_DEFAULT_PROFILE"):
+            env.pop(key, None)
+        env["AWS_ACCESS_KEY_ID"] = credentials["AccessKeyId"]
+        env["AWS_SECRET_ACCESS_KEY"] = credentials["SecretAccessKey"]
+        env["AWS_SESSION_TOKEN"] = credentials["SessionToken"]
+    elif profile:
+        args += ["--profile", profile]
+    if STS_ENDPOINT:
+        env["AWS_ENDPOINT_URL_STS"] = STS_ENDPOINT
+    token = _aws(args, env)
+
+    # the token stops working with the credentials that signed it
+    if credentials and _seconds_left(credentials["Expiration"]) < _seconds_left(
+        token["status"]["expirationTimestamp"]
+    ):
+        token["status"]["expirationTimestamp"] = credentials["Expiration"]
+    _store(path, token)
+    return token
+
+
+def cached_kubeconfig(  # noqa: PLR0917 PLR0913
+    cluster_name: str,
+    endpoint: str,
+    certificate_authority: str,
+    region: str,
+    role_arn: Union[str, None] = None,
+    profile: Union[str, None] = None,
+) -> str:
+    """
+    Kubeconfig for a cluster authenticating through the token cache
+    """
+    args = [PLUGIN, "--cluster-name", cluster_name, "--region", region]
+    if role_arn:
+        args += ["--role-arn", role_arn]
+    if profile:
+        args += ["--profile", profile]
+
+    return json.dumps({
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [
+            {
+                "name": cluster_name,
+                "cluster": {
+                    "server": endpoint,
+                    "certificate-authority-data": certificate_authority,
+                },
+            }
+        ],
+        "contexts": [{"name": cluster_name, "context": {"cluster": cluster_name, "user": "aws"}}],
+        "current-context": cluster_name,
+        "users": [
+            {
+                "name": "aws",
+                "user": {
+                    "exec": {
+                        "apiVersion": "client.authentication.k8s.io/v1beta1",
+                        "command": "python3",
+                        "args": args,
+                        "interactiveMode": "Never",
+                    }
+                },
+            }
+        ],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached EKS exec credential")
+    parser.add_argument("--cluster-name", required=True)
+    parser.add_argument("--region", required=True)
+    parser.add_argument("--role-arn")
+    parser.add_argument("--profile")
+    args = parser.parse_args()
+
+    try:
+        token = cluster_token(args.cluster_name, args.region, args.role_arn, args.profile)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(token))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Twingate connector pool
+"""
+
+# std
+from typing import Dict, List
+
+
+# label the connector pods carry for the anti-affinity and spread rules
+CONNECTOR_LABEL = "juno-innovations.com/twingate-connector"
+
+
+class TwingateConnectors:
+    """
+    Connector pool carrying the remote traffic into the cluster
+
+    count connectors are deployed, each requesting cpu and memory, memory is also the limit.
+    The connectors prefer separate nodes, with required_anti_affinity they never share one and
+    stay pending without a free node. node_group pins them to a node group of the cluster,
+    tolerating its taints. spread_zones spreads them across availability zones as far as the
+    nodes allow.
+    """
+
+    def __init__(  # noqa: PLR0917 PLR0913
+        self,
+        count: int = 2,
+        cpu: str = "500m",
+        memory: str = "512Mi",
+        node_group: str = None,
+        required_anti_affinity: bool = False,
+        spread_zones: bool = True,
+    ):
+        if count < 1:
+            raise ValueError("Twingate connector count must be at least 1")
+        self.count = count
+        self.cpu = cpu
+        self.memory = memory
+        self.node_group = node_group
+        self.required_anti_affinity = required_anti_affinity
+        self.spread_zones = spread_zones
+
+    def __str__(self):
+        parts = [f"{self.count} connector(s)", f"{self.cpu} CPU, {self.memory}"]
+        if self.node_group:
+            parts.append(f"on {self.node_group}")
+        return ", ".join(parts)
+
+    def values(self, node_groups: List[Dict]) -> Dict:
+        """
+        Bootstrap values for the connectors, node_groups are the node groups of the cluster
+        """
+        selector = {"matchLabels": {CONNECTOR_LABEL: "true"}}
+        host = {"labelSelector": selector, "topologyKey": "kubernetes.io/hostname"}
+        if self.required_anti_affinity:
+            anti_affinity = {"requiredDuringSchedulingIgnoredDuringExecution": [host]}
+        else:
+            anti_affinity = {
+                "preferredDuringSchedulingIgnoredDuringExecution": [
+                    {"weight": 100, "podAffinityTerm": host}
+                ]
+            }
+
+        pod = {"affinity": {"podAntiAffinity": anti_affinity}}
+        if self.spread_zones:
+            pod["topologySpreadConstraints"] = [
+                {
+                    "maxSkew": 1,
+                    "topologyKey": "topology.kubernetes.io/zone",
+                    "whenUnsatisfiable": "ScheduleAnyway",
+                    "labelSelector": selector,
+                }
+            ]
+
+        if self.node_group:
+            group = next((group for group in node_groups if group["name"] == self.node_group), None)
+            if group is None:
+                raise ValueError(
+                    f"Twingate connectors pinned to unknown node group: {self.node_group}"
+                )
+            pod["nodeSelector"] = {"juno-innovations.com/node-group": self.node_group}
+            pod["tolerations"] = [
+                {"key": taint, "operator": "Equal", "value": "true", "effect": "NoSchedule"}
+                for taint in group["taints"]
+            ]
+
+        return {
+            "count": self.count,
+            "container": {
+                "resources": {
+                    "requests": {"cpu": self.cpu, "memory": self.memory},
+                    "limits": {"memory": self.memory},
+                }
+            },
+            "pod": pod,
+        }